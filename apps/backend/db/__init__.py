@@ -5,9 +5,11 @@ from .models import (
     Problem,
     ProblemAsset,
     ProblemSubmission,
+    ProblemSubtask,
     Quiz,
     QuizProblem,
     TestCase,
+    TestCaseJob,
     User,
 )
 from .session import SessionLocal, get_db, init_db
@@ -23,7 +25,9 @@ __all__ = [
     "Problem",
     "ProblemAsset",
     "ProblemSubmission",
+    "ProblemSubtask",
     "TestCase",
+    "TestCaseJob",
     "Quiz",
     "QuizProblem",
 ]
@@ -5,13 +5,14 @@ from sqlalchemy import (
     BigInteger,
     Boolean,
     DateTime,
+    FetchedValue,
     Float,
     ForeignKey,
     Integer,
     SmallInteger,
     Text,
 )
-from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -134,6 +135,26 @@ class Problem(Base):
     )
     source: Mapped[str | None] = mapped_column(Text, nullable=True)
     tags: Mapped[list[str]] = mapped_column(ARRAY(Text), nullable=False, default=list)
+    # 입력만 만드는 생성기를 쓸 때 출력을 계산하는 정답 코드입니다.
+    reference_code: Mapped[str | None] = mapped_column(Text, nullable=True)
+    reference_language: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class ProblemSubtask(Base):
+    __tablename__ = "problem_subtasks"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    problem_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("problems.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    name: Mapped[str] = mapped_column(Text, nullable=False)
+    weight: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    order_index: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
 
 
 class TestCase(Base):
@@ -147,8 +168,23 @@ class TestCase(Base):
         ForeignKey("problems.id", ondelete="CASCADE"),
         nullable=False,
     )
+    subtask_id: Mapped[int | None] = mapped_column(
+        BigInteger,
+        ForeignKey("problem_subtasks.id", ondelete="SET NULL"),
+        nullable=True,
+    )
     input: Mapped[str] = mapped_column(Text, nullable=False)
     output: Mapped[str] = mapped_column(Text, nullable=False)
+    # (problem_id, content_hash) 유니크 인덱스로 중복 케이스를 막습니다.
+    # 값은 DB 트리거(test_case_content_hash 함수)가 INSERT/UPDATE 때 채웁니다.
+    content_hash: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+    )
+    run_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    fail_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=utcnow
     )
@@ -171,6 +207,40 @@ class ProblemAsset(Base):
     )
 
 
+class StorageBlob(Base):
+    __tablename__ = "storage_blobs"
+
+    # 내용의 sha256. 파일은 STORAGE_DIR/.blobs/<앞 두 글자>/<sha256>에 한 번만 저장됩니다.
+    sha256: Mapped[str] = mapped_column(Text, primary_key=True)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+
+
+class StorageObject(Base):
+    __tablename__ = "storage_objects"
+
+    bucket: Mapped[str] = mapped_column(Text, primary_key=True)
+    path: Mapped[str] = mapped_column(Text, primary_key=True)
+    sha256: Mapped[str] = mapped_column(
+        Text,
+        ForeignKey("storage_blobs.sha256", ondelete="RESTRICT"),
+        nullable=False,
+    )
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+
+
 class ProblemSubmission(Base):
     __tablename__ = "problem_submissions"
 
@@ -193,6 +263,7 @@ class ProblemSubmission(Base):
     )
     code: Mapped[str] = mapped_column(Text, nullable=False)
     passed_all: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
     stdout_list: Mapped[list[str]] = mapped_column(ARRAY(Text), nullable=False, default=list)
     stderr_list: Mapped[list[str]] = mapped_column(ARRAY(Text), nullable=False, default=list)
     submitted_at: Mapped[datetime] = mapped_column(
@@ -204,10 +275,58 @@ class ProblemSubmission(Base):
     status_code: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
     memory_kb: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
     time_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    wall_time_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     visibility: Mapped[str] = mapped_column(Text, nullable=False, default="public")
     cases_total: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
     cases_done: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
     language: Mapped[str] = mapped_column(Text, nullable=False)
+    language_version: Mapped[str | None] = mapped_column(Text, nullable=True)
+    timings: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+
+
+class TestCaseJob(Base):
+    __tablename__ = "test_case_jobs"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    problem_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("problems.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    # pending / running / succeeded / failed / cancelled
+    status: Mapped[str] = mapped_column(Text, nullable=False, default="pending")
+    output_source: Mapped[str] = mapped_column(Text, nullable=False, default="generator")
+    requested_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    inserted_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    skipped_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cases_per_sec: Mapped[float | None] = mapped_column(Float, nullable=True)
+    error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class SubmissionIdempotencyKey(Base):
+    __tablename__ = "submission_idempotency_keys"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    key: Mapped[str] = mapped_column(Text, primary_key=True)
+    submission_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("problem_submissions.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=utcnow
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
 
 class QuizAttempt(Base):
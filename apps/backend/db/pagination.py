@@ -0,0 +1,140 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Mapping, Sequence
+
+from sqlalchemy import and_, literal, or_, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.schema import Column
+
+from .serializers import serialize_value
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def keyset_columns(table, order_col: Column | None) -> list[Column]:
+    """정렬 컬럼 뒤에 기본 키를 붙여 행마다 유일한 정렬 키를 만듭니다."""
+    columns = [order_col] if order_col is not None else []
+    for pk in table.primary_key.columns:
+        if all(pk is not col for col in columns):
+            columns.append(pk)
+    return columns
+
+
+def keyset_order_by(columns: Sequence[Column], ascending: bool) -> list:
+    """
+    keyset_condition이 가정하는 NULL 위치(ASC는 NULLS LAST, DESC는 NULLS FIRST)를 명시합니다.
+    PostgreSQL 기본값과 같아 인덱스 사용에는 영향이 없습니다.
+    """
+    order_by = []
+    for col in columns:
+        if ascending:
+            order_by.append(col.asc().nulls_last() if col.nullable else col.asc())
+        else:
+            order_by.append(col.desc().nulls_first() if col.nullable else col.desc())
+    return order_by
+
+
+def encode_cursor(columns: Sequence[Column], ascending: bool, values: Sequence[Any]) -> str:
+    """마지막 행의 정렬 키를 불투명한 토큰으로 만듭니다. 정렬 기준이 다르면 재사용할 수 없습니다."""
+    payload = {
+        "k": [col.name for col in columns],
+        "a": ascending,
+        "v": [serialize_value(value) for value in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _coerce_cursor_value(column: Column, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is uuid.UUID:
+        return uuid.UUID(str(value))
+    return python_type(value)
+
+
+def decode_cursor(token: str, columns: Sequence[Column], ascending: bool) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if payload["k"] != [col.name for col in columns] or payload["a"] != ascending:
+            raise InvalidCursor("Cursor does not match the requested order")
+        values = payload["v"]
+        if len(values) != len(columns):
+            raise InvalidCursor("Invalid cursor")
+        return [_coerce_cursor_value(col, value) for col, value in zip(columns, values)]
+    except InvalidCursor:
+        raise
+    except (binascii.Error, KeyError, TypeError, ValueError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+
+
+def keyset_condition(
+    columns: Sequence[Column], ascending: bool, values: Sequence[Any]
+) -> ColumnElement[bool]:
+    """
+    커서 다음 행을 고르는 조건입니다. (정렬 컬럼, 기본 키) 행 비교라서
+    같은 순서의 복합 인덱스가 있으면 인덱스 범위 스캔으로 처리됩니다.
+    PostgreSQL 기본값(ASC는 NULLS LAST, DESC는 NULLS FIRST)에 맞춰 NULL 정렬 값도 다룹니다.
+    """
+    head, head_value = columns[0], values[0]
+    rest, rest_values = columns[1:], values[1:]
+
+    def after(cols, vals):
+        if len(cols) == 1:
+            return cols[0] > vals[0] if ascending else cols[0] < vals[0]
+        # 값 쪽도 컬럼 타입으로 바인딩해야 BIGINT 등이 INTEGER로 캐스팅되지 않습니다.
+        bound = tuple_(*[literal(val, col.type) for col, val in zip(cols, vals)])
+        return tuple_(*cols) > bound if ascending else tuple_(*cols) < bound
+
+    if not head.nullable or len(columns) == 1:
+        return after(columns, values)
+
+    if head_value is None:
+        same_null = and_(head.is_(None), after(rest, rest_values))
+        # ASC에서는 NULL이 마지막이라 남은 행은 같은 NULL 그룹뿐입니다.
+        return same_null if ascending else or_(same_null, head.is_not(None))
+
+    if ascending:
+        return or_(after(columns, values), head.is_(None))
+    return after(columns, values)
+
+
+def apply_keyset(
+    query, columns: Sequence[Column], ascending: bool, cursor: str | None, limit: int
+):
+    """
+    커서 조건, 정렬, limit을 붙입니다. 다음 페이지가 있는지 알기 위해 한 행을 더 읽습니다.
+    OFFSET을 쓰지 않으므로 뒤쪽 페이지도 앞쪽과 같은 비용으로 읽습니다.
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns, ascending)
+        query = query.where(keyset_condition(columns, ascending, values))
+    return query.order_by(*keyset_order_by(columns, ascending)).limit(limit + 1)
+
+
+def keyset_page(
+    rows: Sequence[Any], columns: Sequence[Column], ascending: bool, limit: int
+) -> tuple[list[Any], str | None]:
+    """apply_keyset으로 읽은 행을 한 페이지와 다음 커서(없으면 None)로 나눕니다."""
+    if len(rows) <= limit:
+        return list(rows), None
+
+    page = list(rows[:limit])
+    last = page[-1]
+    if isinstance(last, Mapping):
+        values = [last[col.name] for col in columns]
+    else:
+        values = [getattr(last, col.key) for col in columns]
+    return page, encode_cursor(columns, ascending, values)
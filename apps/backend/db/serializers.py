@@ -1,5 +1,6 @@
+import uuid
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable, Mapping
 
 from .models import (
     Organization,
@@ -7,18 +8,44 @@ from .models import (
     Problem,
     ProblemAsset,
     ProblemSubmission,
+    ProblemSubtask,
     Quiz,
     QuizAttempt,
     QuizProblem,
     TestCase,
+    TestCaseJob,
     User,
 )
 
+# 가입 대기/비밀번호 재설정처럼 인증 절차 중에만 쓰는 테이블입니다. 행 전체를 내보내지 않습니다.
+HIDDEN_TABLES: frozenset[str] = frozenset({"pending_signups", "password_resets"})
+
+# 응답에 절대 내보내지 않는 컬럼입니다. serialize_* 함수도 이 컬럼은 빼고 직렬화합니다.
+HIDDEN_COLUMNS: dict[str, frozenset[str]] = {
+    "users": frozenset({"password_hash"}),
+}
+
 
 def _dt(value: datetime | None) -> str | None:
     return value.isoformat() if value else None
 
 
+def serialize_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def serialize_columns(row: Mapping[str, Any], columns: Iterable[str]) -> dict[str, Any]:
+    """
+    ORM 객체 없이 select(컬럼...) 결과 한 행을 serialize_* 와 같은 형태로 바꿉니다.
+    결과에 없는 컬럼은 None으로 채웁니다.
+    """
+    return {column: serialize_value(row.get(column)) for column in columns}
+
+
 def serialize_user(user: User) -> dict[str, Any]:
     return {
         "id": str(user.id),
@@ -72,6 +99,19 @@ def serialize_problem(problem: Problem) -> dict[str, Any]:
         "available_languages": problem.available_languages,
         "source": problem.source,
         "tags": problem.tags,
+        "reference_code": problem.reference_code,
+        "reference_language": problem.reference_language,
+    }
+
+
+def serialize_problem_subtask(subtask: ProblemSubtask) -> dict[str, Any]:
+    return {
+        "id": subtask.id,
+        "problem_id": subtask.problem_id,
+        "name": subtask.name,
+        "weight": subtask.weight,
+        "order_index": subtask.order_index,
+        "created_at": _dt(subtask.created_at),
     }
 
 
@@ -79,12 +119,34 @@ def serialize_test_case(test_case: TestCase) -> dict[str, Any]:
     return {
         "id": str(test_case.id),
         "problem_id": test_case.problem_id,
+        "subtask_id": test_case.subtask_id,
         "input": test_case.input,
         "output": test_case.output,
+        "content_hash": test_case.content_hash,
+        "run_count": test_case.run_count,
+        "fail_count": test_case.fail_count,
         "created_at": _dt(test_case.created_at),
     }
 
 
+def serialize_test_case_job(job: TestCaseJob) -> dict[str, Any]:
+    return {
+        "id": job.id,
+        "problem_id": job.problem_id,
+        "status": job.status,
+        "output_source": job.output_source,
+        "requested_count": job.requested_count,
+        "inserted_count": job.inserted_count,
+        "skipped_count": job.skipped_count,
+        "cases_per_sec": job.cases_per_sec,
+        "error_message": job.error_message,
+        "cancel_requested": job.cancel_requested,
+        "created_at": _dt(job.created_at),
+        "started_at": _dt(job.started_at),
+        "finished_at": _dt(job.finished_at),
+    }
+
+
 def serialize_problem_asset(asset: ProblemAsset) -> dict[str, Any]:
     return {
         "id": asset.id,
@@ -105,6 +167,7 @@ def serialize_problem_submission(submission: ProblemSubmission) -> dict[str, Any
         "quiz_attempt_started_at": _dt(submission.quiz_attempt_started_at),
         "code": submission.code,
         "passed_all": submission.passed_all,
+        "score": submission.score,
         "stdout_list": submission.stdout_list,
         "stderr_list": submission.stderr_list,
         "submitted_at": _dt(submission.submitted_at),
@@ -114,10 +177,13 @@ def serialize_problem_submission(submission: ProblemSubmission) -> dict[str, Any
         "status_code": submission.status_code,
         "memory_kb": submission.memory_kb,
         "time_ms": submission.time_ms,
+        "wall_time_ms": submission.wall_time_ms,
         "visibility": submission.visibility,
         "cases_total": submission.cases_total,
         "cases_done": submission.cases_done,
         "language": submission.language,
+        "language_version": submission.language_version,
+        "timings": submission.timings,
     }
 
 
@@ -165,8 +231,12 @@ def serialize_row(row: Any) -> dict[str, Any]:
         return serialize_organization_member(row)
     if isinstance(row, Problem):
         return serialize_problem(row)
+    if isinstance(row, ProblemSubtask):
+        return serialize_problem_subtask(row)
     if isinstance(row, TestCase):
         return serialize_test_case(row)
+    if isinstance(row, TestCaseJob):
+        return serialize_test_case_job(row)
     if isinstance(row, ProblemAsset):
         return serialize_problem_asset(row)
     if isinstance(row, ProblemSubmission):
@@ -72,6 +72,138 @@ async def init_db() -> None:
         await conn.exec_driver_sql(
             "ALTER TABLE problem_submissions ADD COLUMN IF NOT EXISTS quiz_attempt_started_at timestamptz"
         )
+        await conn.exec_driver_sql(
+            "ALTER TABLE problem_submissions ADD COLUMN IF NOT EXISTS language_version text"
+        )
+        await conn.exec_driver_sql(
+            "ALTER TABLE problem_submissions ADD COLUMN IF NOT EXISTS wall_time_ms integer NOT NULL DEFAULT 0"
+        )
+        await conn.exec_driver_sql(
+            "ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS run_count integer NOT NULL DEFAULT 0"
+        )
+        await conn.exec_driver_sql(
+            "ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS fail_count integer NOT NULL DEFAULT 0"
+        )
+        await conn.exec_driver_sql(
+            "ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS subtask_id bigint REFERENCES problem_subtasks(id) ON DELETE SET NULL"
+        )
+        await conn.exec_driver_sql(
+            "ALTER TABLE problem_submissions ADD COLUMN IF NOT EXISTS score real NOT NULL DEFAULT 0"
+        )
+        await conn.exec_driver_sql(
+            "ALTER TABLE problem_submissions ADD COLUMN IF NOT EXISTS timings jsonb"
+        )
+        await conn.exec_driver_sql(
+            "ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS content_hash text"
+        )
+        # 해시 정의는 이 함수 하나뿐입니다. 트리거가 INSERT/UPDATE 때 content_hash를 채웁니다.
+        await conn.exec_driver_sql(
+            """
+            CREATE OR REPLACE FUNCTION test_case_content_hash(input_text text, output_text text)
+            RETURNS text LANGUAGE sql IMMUTABLE AS $$
+                SELECT encode(
+                    sha256(
+                        convert_to(
+                            btrim(replace(input_text, E'\\r\\n', E'\\n'), E' \\t\\r\\n')
+                            || chr(30)
+                            || btrim(replace(output_text, E'\\r\\n', E'\\n'), E' \\t\\r\\n'),
+                            'UTF8'
+                        )
+                    ),
+                    'hex'
+                )
+            $$
+            """
+        )
+        await conn.exec_driver_sql(
+            """
+            CREATE OR REPLACE FUNCTION test_cases_set_content_hash()
+            RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                NEW.content_hash := test_case_content_hash(NEW.input, NEW.output);
+                RETURN NEW;
+            END
+            $$
+            """
+        )
+        content_hash_indexed = (
+            await conn.exec_driver_sql(
+                "SELECT to_regclass('uq_test_cases_problem_content_hash') IS NOT NULL"
+            )
+        ).scalar()
+        if not content_hash_indexed:
+            # 유니크 인덱스가 없을 때 한 번만 기존 케이스의 해시를 채웁니다. 이미 중복된 케이스는
+            # 가장 오래된 것만 해시를 갖고 나머지는 NULL로 남겨 인덱스 생성이 실패하지 않게 합니다.
+            await conn.exec_driver_sql(
+                """
+                UPDATE test_cases AS t
+                SET content_hash = CASE WHEN h.rn = 1 THEN h.content_hash END
+                FROM (
+                    SELECT
+                        id,
+                        row_number() OVER (
+                            PARTITION BY problem_id, content_hash ORDER BY created_at, id
+                        ) AS rn,
+                        content_hash
+                    FROM (
+                        SELECT id, problem_id, created_at, test_case_content_hash(input, output) AS content_hash
+                        FROM test_cases
+                    ) AS s
+                ) AS h
+                WHERE t.id = h.id
+                  AND t.content_hash IS DISTINCT FROM CASE WHEN h.rn = 1 THEN h.content_hash END
+                """
+            )
+            await conn.exec_driver_sql(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_test_cases_problem_content_hash ON test_cases(problem_id, content_hash)"
+            )
+        # 백필 UPDATE가 트리거로 다시 계산되지 않도록 트리거는 백필 뒤에 겁니다.
+        await conn.exec_driver_sql(
+            "CREATE OR REPLACE TRIGGER trg_test_cases_content_hash BEFORE INSERT OR UPDATE OF input, output, content_hash ON test_cases FOR EACH ROW EXECUTE FUNCTION test_cases_set_content_hash()"
+        )
+        await conn.exec_driver_sql(
+            "ALTER TABLE problems ADD COLUMN IF NOT EXISTS reference_code text"
+        )
+        await conn.exec_driver_sql(
+            "ALTER TABLE problems ADD COLUMN IF NOT EXISTS reference_language text"
+        )
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_test_case_jobs_problem ON test_case_jobs(problem_id, created_at DESC)"
+        )
+        # 생성 작업은 프로세스 안의 백그라운드 태스크라 재시작하면 이어서 실행되지 않습니다.
+        await conn.exec_driver_sql(
+            "UPDATE test_case_jobs SET status = 'failed', error_message = 'Interrupted by server restart', finished_at = NOW() WHERE status IN ('pending', 'running')"
+        )
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_storage_objects_sha256 ON storage_objects(sha256)"
+        )
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_storage_blobs_unreferenced ON storage_blobs(updated_at) WHERE ref_count = 0"
+        )
+        # 목록 API의 keyset 페이지네이션이 인덱스 범위 스캔을 타도록 (필터, 정렬, id) 순서로 둡니다.
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_test_cases_problem_created ON test_cases(problem_id, created_at DESC, id DESC)"
+        )
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_submissions_problem_id ON problem_submissions(problem_id, id DESC)"
+        )
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_submissions_user_id ON problem_submissions(user_id, id DESC)"
+        )
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_problems_org_id ON problems(organization_id, id DESC)"
+        )
+        # 위 복합 인덱스가 앞 컬럼만 쓰는 조회도 처리하므로 단일 컬럼 인덱스는 쓰기 비용만 늘립니다.
+        await conn.exec_driver_sql("DROP INDEX IF EXISTS idx_test_cases_problem")
+        await conn.exec_driver_sql("DROP INDEX IF EXISTS idx_submissions_problem")
+        await conn.exec_driver_sql("DROP INDEX IF EXISTS idx_submissions_user")
+        await conn.exec_driver_sql("DROP INDEX IF EXISTS idx_problems_org")
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_problem_subtasks_problem ON problem_subtasks(problem_id)"
+        )
+        await conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS idx_submission_idempotency_keys_expires_at ON submission_idempotency_keys(expires_at)"
+        )
         await conn.exec_driver_sql(
             "CREATE INDEX IF NOT EXISTS idx_problem_submissions_user_quiz_submitted_at ON problem_submissions(user_id, quiz_id, submitted_at DESC)"
         )
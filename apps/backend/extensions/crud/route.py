@@ -8,18 +8,25 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from extensions.auth.route import _auth_user_id_from_request
+from extensions.testCase.func import (
+    INSERT_CHUNK_SIZE,
+    MAX_INSERT_CHUNK_SIZE,
+    insert_test_cases_streaming,
+)
 
 from db.models import (
     Organization,
     OrganizationMember,
     Problem,
     ProblemSubmission,
+    ProblemSubtask,
     Quiz,
     QuizAttempt,
     QuizProblem,
     TestCase,
     User,
 )
+from db.pagination import InvalidCursor, apply_keyset, keyset_columns, keyset_page
 from db.session import get_db
 
 router = APIRouter(
@@ -28,6 +35,8 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+DEFAULT_PAGE_SIZE = 50
+
 
 def dt(value: datetime | None) -> str | None:
     return value.isoformat() if value else None
@@ -86,6 +95,19 @@ def problem_to_dict(problem: Problem) -> dict:
         "available_languages": problem.available_languages,
         "source": problem.source,
         "tags": problem.tags,
+        "reference_code": problem.reference_code,
+        "reference_language": problem.reference_language,
+    }
+
+
+def problem_subtask_to_dict(subtask: ProblemSubtask) -> dict:
+    return {
+        "id": subtask.id,
+        "problem_id": subtask.problem_id,
+        "name": subtask.name,
+        "weight": subtask.weight,
+        "order_index": subtask.order_index,
+        "created_at": dt(subtask.created_at),
     }
 
 
@@ -93,8 +115,12 @@ def test_case_to_dict(test_case: TestCase) -> dict:
     return {
         "id": str(test_case.id),
         "problem_id": test_case.problem_id,
+        "subtask_id": test_case.subtask_id,
         "input": test_case.input,
         "output": test_case.output,
+        "content_hash": test_case.content_hash,
+        "run_count": test_case.run_count,
+        "fail_count": test_case.fail_count,
         "created_at": dt(test_case.created_at),
     }
 
@@ -108,6 +134,7 @@ def submission_to_dict(submission: ProblemSubmission) -> dict:
         "quiz_attempt_started_at": dt(submission.quiz_attempt_started_at),
         "code": submission.code,
         "passed_all": submission.passed_all,
+        "score": submission.score,
         "stdout_list": submission.stdout_list,
         "stderr_list": submission.stderr_list,
         "submitted_at": dt(submission.submitted_at),
@@ -117,10 +144,13 @@ def submission_to_dict(submission: ProblemSubmission) -> dict:
         "status_code": submission.status_code,
         "memory_kb": submission.memory_kb,
         "time_ms": submission.time_ms,
+        "wall_time_ms": submission.wall_time_ms,
         "visibility": submission.visibility,
         "cases_total": submission.cases_total,
         "cases_done": submission.cases_done,
         "language": submission.language,
+        "language_version": submission.language_version,
+        "timings": submission.timings,
     }
 
 
@@ -198,6 +228,8 @@ class ProblemCreate(BaseModel):
     available_languages: list[str] = Field(default_factory=list)
     source: str | None = None
     tags: list[str] = Field(default_factory=list)
+    reference_code: str | None = None
+    reference_language: str | None = None
 
 
 class ProblemUpdate(BaseModel):
@@ -218,12 +250,40 @@ class ProblemUpdate(BaseModel):
     available_languages: list[str] | None = None
     source: str | None = None
     tags: list[str] | None = None
+    reference_code: str | None = None
+    reference_language: str | None = None
+
+
+class ProblemSubtaskCreate(BaseModel):
+    problem_id: int
+    name: str
+    weight: float = 0.0
+    order_index: int = 0
+
+
+class ProblemSubtaskUpdate(BaseModel):
+    name: str | None = None
+    weight: float | None = None
+    order_index: int | None = None
 
 
 class TestCaseCreate(BaseModel):
     problem_id: int
     input: str
     output: str
+    subtask_id: int | None = None
+
+
+class TestCaseBulkItem(BaseModel):
+    input: str
+    output: str
+
+
+class TestCaseBulkCreate(BaseModel):
+    problem_id: int
+    subtask_id: int | None = None
+    cases: list[TestCaseBulkItem]
+    chunk_size: int = Field(default=INSERT_CHUNK_SIZE, ge=1, le=MAX_INSERT_CHUNK_SIZE)
 
 
 class TestCaseDeleteRequest(BaseModel):
@@ -266,6 +326,17 @@ class QuizProblemCreate(BaseModel):
     order_index: int = 0
 
 
+async def _fetch_keyset_page(
+    db: AsyncSession, query, key_cols, ascending: bool, cursor: str | None, limit: int
+) -> tuple[list, str | None]:
+    try:
+        query = apply_keyset(query, key_cols, ascending, cursor, limit)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    rows = await db.execute(query)
+    return keyset_page(rows.scalars().all(), key_cols, ascending, limit)
+
+
 @router.post("/users")
 async def create_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
     user = User(
@@ -437,15 +508,32 @@ async def delete_organization_member(
 async def list_problems(
     organization_id: int | None = None,
     created_by: uuid.UUID | None = None,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    cursor: str | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    query = select(Problem).order_by(Problem.id.desc())
+    query = select(Problem)
     if organization_id is not None:
         query = query.where(Problem.organization_id == organization_id)
     if created_by is not None:
         query = query.where(Problem.created_by == created_by)
 
-    rows = await db.execute(query)
+    # limit/cursor를 주면 id 기준 keyset 페이지와 next_cursor를 반환합니다.
+    if limit is not None or cursor is not None:
+        items, next_cursor = await _fetch_keyset_page(
+            db,
+            query,
+            keyset_columns(Problem.__table__, None),
+            False,
+            cursor,
+            limit or DEFAULT_PAGE_SIZE,
+        )
+        return {
+            "items": [problem_to_dict(problem) for problem in items],
+            "next_cursor": next_cursor,
+        }
+
+    rows = await db.execute(query.order_by(Problem.id.desc()))
     return [problem_to_dict(problem) for problem in rows.scalars().all()]
 
 
@@ -705,30 +793,96 @@ async def update_problem(
     return problem_to_dict(problem)
 
 
+@router.get("/problem-subtasks")
+async def list_problem_subtasks(problem_id: int, db: AsyncSession = Depends(get_db)):
+    rows = await db.execute(
+        select(ProblemSubtask)
+        .where(ProblemSubtask.problem_id == problem_id)
+        .order_by(ProblemSubtask.order_index.asc(), ProblemSubtask.id.asc())
+    )
+    return [problem_subtask_to_dict(item) for item in rows.scalars().all()]
+
+
+@router.post("/problem-subtasks")
+async def create_problem_subtask(
+    payload: ProblemSubtaskCreate,
+    db: AsyncSession = Depends(get_db),
+):
+    problem = await db.get(Problem, payload.problem_id)
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+
+    subtask = ProblemSubtask(**payload.model_dump())
+    db.add(subtask)
+    await db.commit()
+    await db.refresh(subtask)
+    return problem_subtask_to_dict(subtask)
+
+
+@router.patch("/problem-subtasks/{subtask_id}")
+async def update_problem_subtask(
+    subtask_id: int,
+    payload: ProblemSubtaskUpdate,
+    db: AsyncSession = Depends(get_db),
+):
+    subtask = await db.get(ProblemSubtask, subtask_id)
+    if not subtask:
+        raise HTTPException(status_code=404, detail="Subtask not found")
+
+    updates = payload.model_dump(exclude_unset=True)
+    for key, value in updates.items():
+        setattr(subtask, key, value)
+
+    await db.commit()
+    await db.refresh(subtask)
+    return problem_subtask_to_dict(subtask)
+
+
+@router.delete("/problem-subtasks/{subtask_id}")
+async def delete_problem_subtask(
+    subtask_id: int,
+    db: AsyncSession = Depends(get_db),
+):
+    subtask = await db.get(ProblemSubtask, subtask_id)
+    if not subtask:
+        raise HTTPException(status_code=404, detail="Subtask not found")
+
+    await db.delete(subtask)
+    await db.commit()
+    return {"deleted": True}
+
+
 @router.get("/test-cases")
 async def list_test_cases(
     problem_id: int,
     page: int = Query(default=1, ge=1),
-    page_size: int = Query(default=50, ge=1, le=500),
+    page_size: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=500),
+    cursor: str | None = None,
     db: AsyncSession = Depends(get_db),
 ):
     total = await db.scalar(
         select(func.count()).select_from(TestCase).where(TestCase.problem_id == problem_id)
     )
 
-    rows = await db.execute(
-        select(TestCase)
-        .where(TestCase.problem_id == problem_id)
-        .order_by(TestCase.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
+    # cursor가 있으면 page 대신 (created_at, id) keyset으로 이어서 읽습니다.
+    query = select(TestCase).where(TestCase.problem_id == problem_id)
+    if cursor is None:
+        query = query.offset((page - 1) * page_size)
+    items, next_cursor = await _fetch_keyset_page(
+        db,
+        query,
+        keyset_columns(TestCase.__table__, TestCase.__table__.c.created_at),
+        False,
+        cursor,
+        page_size,
     )
 
     return {
-        "items": [test_case_to_dict(case) for case in rows.scalars().all()],
+        "items": [test_case_to_dict(case) for case in items],
         "total": total or 0,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
     }
 
 
@@ -738,17 +892,51 @@ async def create_test_case(payload: TestCaseCreate, db: AsyncSession = Depends(g
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
 
+    if payload.subtask_id is not None:
+        subtask = await db.get(ProblemSubtask, payload.subtask_id)
+        if not subtask or subtask.problem_id != payload.problem_id:
+            raise HTTPException(status_code=404, detail="Subtask not found")
+
     test_case = TestCase(
         problem_id=payload.problem_id,
+        subtask_id=payload.subtask_id,
         input=payload.input,
         output=payload.output,
     )
     db.add(test_case)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Duplicate test case") from exc
+
     await db.refresh(test_case)
     return test_case_to_dict(test_case)
 
 
+@router.post("/test-cases/bulk")
+async def create_test_cases_bulk(
+    payload: TestCaseBulkCreate, db: AsyncSession = Depends(get_db)
+):
+    problem = await db.get(Problem, payload.problem_id)
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+
+    if payload.subtask_id is not None:
+        subtask = await db.get(ProblemSubtask, payload.subtask_id)
+        if not subtask or subtask.problem_id != payload.problem_id:
+            raise HTTPException(status_code=404, detail="Subtask not found")
+
+    # 중복 케이스는 409 대신 skipped로 집계합니다.
+    return await insert_test_cases_streaming(
+        db,
+        payload.problem_id,
+        ((case.input, case.output) for case in payload.cases),
+        subtask_id=payload.subtask_id,
+        chunk_size=payload.chunk_size,
+    )
+
+
 @router.delete("/test-cases")
 async def delete_test_cases(
     payload: TestCaseDeleteRequest,
@@ -768,9 +956,11 @@ async def list_problem_submissions(
     user_id: uuid.UUID | None = None,
     organization_id: int | None = None,
     visibility: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    cursor: str | None = None,
     db: AsyncSession = Depends(get_db),
 ):
-    query = select(ProblemSubmission).order_by(ProblemSubmission.id.desc())
+    query = select(ProblemSubmission)
 
     if organization_id is not None:
         query = query.join(Problem, Problem.id == ProblemSubmission.problem_id).where(
@@ -783,7 +973,22 @@ async def list_problem_submissions(
     if visibility is not None:
         query = query.where(ProblemSubmission.visibility == visibility)
 
-    rows = await db.execute(query)
+    # limit/cursor를 주면 id 기준 keyset 페이지와 next_cursor를 반환합니다.
+    if limit is not None or cursor is not None:
+        items, next_cursor = await _fetch_keyset_page(
+            db,
+            query,
+            keyset_columns(ProblemSubmission.__table__, None),
+            False,
+            cursor,
+            limit or DEFAULT_PAGE_SIZE,
+        )
+        return {
+            "items": [submission_to_dict(item) for item in items],
+            "next_cursor": next_cursor,
+        }
+
+    rows = await db.execute(query.order_by(ProblemSubmission.id.desc()))
     return [submission_to_dict(item) for item in rows.scalars().all()]
 
 
@@ -1,11 +1,15 @@
+import json
+import os
 from datetime import datetime
+from itertools import groupby
 import uuid
 from typing import Any, Literal
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
-from sqlalchemy import and_, func, or_, select
+from sqlalchemy import and_, delete, func, insert, or_, select, text, update
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.elements import ColumnElement
 from sqlalchemy.sql.schema import Column
@@ -18,13 +22,15 @@ from db.models import (
     Problem,
     ProblemAsset,
     ProblemSubmission,
+    ProblemSubtask,
     Quiz,
     QuizAttempt,
     QuizProblem,
     TestCase,
     User,
 )
-from db.serializers import serialize_row
+from db.pagination import InvalidCursor, apply_keyset, keyset_columns, keyset_page
+from db.serializers import HIDDEN_COLUMNS, HIDDEN_TABLES, serialize_columns
 from db.session import get_db
 
 router = APIRouter(
@@ -34,12 +40,18 @@ router = APIRouter(
 )
 
 
+DEFAULT_CURSOR_LIMIT = 100
+# /insert 한 번의 executemany에 넘기는 최대 행 수입니다.
+INSERT_CHUNK_ROWS = int(os.getenv("DBAPI_INSERT_CHUNK_ROWS", "1000"))
+TOTAL_COUNT_LABEL = "__total_count"
+
 MODEL_MAP = {
     "users": User,
     "organizations": Organization,
     "organization_members": OrganizationMember,
     "pending_signups": PendingSignup,
     "problems": Problem,
+    "problem_subtasks": ProblemSubtask,
     "test_cases": TestCase,
     "problem_assets": ProblemAsset,
     "problem_submissions": ProblemSubmission,
@@ -68,7 +80,11 @@ class SelectRequest(BaseModel):
     order: QueryOrder | None = None
     range_from: int | None = None
     range_to: int | None = None
-    count: bool = False
+    # limit을 주면 range 대신 커서(keyset) 페이지네이션을 씁니다. 응답의 next_cursor를 다음 요청에 넘깁니다.
+    limit: int | None = Field(default=None, ge=1, le=1000)
+    cursor: str | None = None
+    # True/"exact"는 정확한 개수, "estimated"는 플래너 통계 기반 어림값입니다.
+    count: Literal["exact", "estimated"] | bool = False
     head: bool = False
 
 
@@ -99,7 +115,7 @@ def _normalize_table_name(name: str) -> str:
 
 def _get_model(name: str):
     normalized = _normalize_table_name(name)
-    model = MODEL_MAP.get(normalized)
+    model = None if normalized in HIDDEN_TABLES else MODEL_MAP.get(normalized)
     if model is None:
         raise HTTPException(status_code=400, detail=f"Unsupported table: {name}")
     return model
@@ -190,20 +206,27 @@ def _apply_filters(query, model, filters: list[QueryFilter], or_filters: list[Qu
     return query
 
 
-def _serialize_rows(rows: list[Any]) -> list[dict[str, Any]]:
-    return [serialize_row(row) for row in rows]
-
+def _select_columns(model, columns: str) -> tuple[list[str], list[Column]]:
+    """
+    columns 문자열을 (응답 키 목록, SELECT할 컬럼 목록)으로 바꿉니다.
+    모르는 컬럼이나 숨김 컬럼은 SELECT하지 않고 응답에서 None으로 채웁니다.
+    """
+    table = model.__table__
+    hidden = HIDDEN_COLUMNS.get(table.name, frozenset())
 
-def _project_rows(rows: list[dict[str, Any]], columns: str) -> list[dict[str, Any]]:
     columns = columns.strip()
-    if not columns or columns == "*":
-        return rows
-
     selected = [col.strip() for col in columns.split(",") if col.strip()]
-    if not selected:
-        return rows
+    if not selected or "*" in selected:
+        selected = [col.name for col in table.c if col.name not in hidden]
 
-    return [{col: row.get(col) for col in selected} for row in rows]
+    names = list(dict.fromkeys(selected))
+    select_cols = [
+        table.c[name] for name in names if name in table.c and name not in hidden
+    ]
+    if not select_cols:
+        # 행 수는 맞춰야 하므로 기본 키만이라도 읽습니다.
+        select_cols = list(table.primary_key.columns)
+    return names, select_cols
 
 
 def _sanitize_payload(model, payload: dict[str, Any]) -> dict[str, Any]:
@@ -220,104 +243,240 @@ def _sanitize_payload(model, payload: dict[str, Any]) -> dict[str, Any]:
 @router.post("/select")
 async def select_rows(payload: SelectRequest, db: AsyncSession = Depends(get_db)):
     model = _get_model(payload.table)
-
-    base_query = select(model)
-    base_query = _apply_filters(base_query, model, payload.filters, payload.or_filters)
+    count_mode = "exact" if payload.count is True else payload.count or None
 
     total_count: int | None = None
-    if payload.count:
-        count_query = select(func.count()).select_from(base_query.subquery())
-        total_count = int((await db.execute(count_query)).scalar_one())
+    if count_mode == "estimated":
+        total_count = await _estimate_count(db, model, payload)
+    elif count_mode == "exact" and payload.head:
+        total_count = await _exact_count(db, model, payload)
 
-    query = base_query
+    if payload.head:
+        return {"rows": [], "count": total_count, "error": None, "next_cursor": None}
+
+    # ORM 엔티티를 만들지 않고 요청한 컬럼만 SELECT해서 바로 직렬화합니다.
+    names, select_cols = _select_columns(model, payload.columns)
+    query = _apply_filters(select(*select_cols), model, payload.filters, payload.or_filters)
+
+    # 정확한 개수는 별도 왕복 없이 같은 문장에서 count(*) OVER ()로 함께 받습니다.
+    # 커서 조건이 붙으면 남은 행만 세게 되므로 그때는 따로 셉니다.
+    count_in_page = count_mode == "exact" and not payload.cursor
+    if count_in_page:
+        query = query.add_columns(func.count().over().label(TOTAL_COUNT_LABEL))
+
+    next_cursor: str | None = None
+    if payload.limit is not None or payload.cursor is not None:
+        rows, next_cursor = await _select_keyset_page(db, model, query, select_cols, payload)
+    else:
+        if payload.order:
+            order_col = _get_column(model, payload.order.column)
+            query = query.order_by(
+                order_col.asc() if payload.order.ascending else order_col.desc()
+            )
 
-    if payload.order:
-        order_col = _get_column(model, payload.order.column)
-        query = query.order_by(
-            order_col.asc() if payload.order.ascending else order_col.desc()
+        if payload.range_from is not None:
+            query = query.offset(payload.range_from)
+
+        if payload.range_to is not None and payload.range_from is not None:
+            query = query.limit((payload.range_to - payload.range_from) + 1)
+
+        rows = (await db.execute(query)).mappings().all()
+
+    if count_mode == "exact":
+        if count_in_page and rows:
+            total_count = int(rows[0][TOTAL_COUNT_LABEL])
+        elif count_in_page and not payload.range_from:
+            total_count = 0
+        else:
+            # OFFSET이 범위를 넘어 빈 페이지가 나왔거나 커서 페이지인 경우입니다.
+            total_count = await _exact_count(db, model, payload)
+
+    return {
+        "rows": [serialize_columns(row, names) for row in rows],
+        "count": total_count,
+        "error": None,
+        "next_cursor": next_cursor,
+    }
+
+
+async def _exact_count(db: AsyncSession, model, payload: SelectRequest) -> int:
+    query = select(func.count()).select_from(model)
+    query = _apply_filters(query, model, payload.filters, payload.or_filters)
+    return int((await db.execute(query)).scalar_one())
+
+
+async def _estimate_count(db: AsyncSession, model, payload: SelectRequest) -> int:
+    """
+    플래너 통계로 행 수를 어림합니다. 필터가 없으면 pg_class.reltuples를,
+    필터가 있거나 아직 ANALYZE 전이면 EXPLAIN의 예상 행 수를 씁니다.
+    """
+    table = model.__table__
+    if not payload.filters and not payload.or_filters:
+        reltuples = await db.scalar(
+            text(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"
+            ),
+            {"table": table.name},
         )
+        # 한 번도 ANALYZE되지 않은 테이블은 -1입니다.
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
 
-    if payload.range_from is not None:
-        query = query.offset(payload.range_from)
+    query = select(*table.primary_key.columns)
+    query = _apply_filters(query, model, payload.filters, payload.or_filters)
 
-    if payload.range_to is not None and payload.range_from is not None:
-        query = query.limit((payload.range_to - payload.range_from) + 1)
+    conn = await db.connection()
+    compiled = query.compile(
+        dialect=conn.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _select_keyset_page(
+    db: AsyncSession,
+    model,
+    query,
+    select_cols: list[Column],
+    payload: SelectRequest,
+) -> tuple[list[Any], str | None]:
+    if payload.range_from is not None or payload.range_to is not None:
+        raise HTTPException(
+            status_code=400, detail="Use either limit/cursor or range_from/range_to"
+        )
 
-    result = await db.execute(query)
-    rows = list(result.scalars().all())
-    serialized = _serialize_rows(rows)
-    projected = _project_rows(serialized, payload.columns)
+    order_col = None
+    ascending = True
+    if payload.order:
+        order_col = _get_column(model, payload.order.column)
+        ascending = payload.order.ascending
+        if order_col.name in HIDDEN_COLUMNS.get(model.__table__.name, ()):
+            raise HTTPException(
+                status_code=400, detail=f"Cannot order by '{order_col.name}'"
+            )
 
-    if payload.head:
-        projected = []
+    # 정렬 컬럼 + 기본 키가 커서가 되므로 요청하지 않았어도 함께 읽습니다.
+    key_cols = keyset_columns(model.__table__, order_col)
+    extra_cols = [col for col in key_cols if all(col is not sel for sel in select_cols)]
+    if extra_cols:
+        query = query.add_columns(*extra_cols)
 
-    return {"rows": projected, "count": total_count, "error": None}
+    limit = payload.limit or DEFAULT_CURSOR_LIMIT
+    try:
+        query = apply_keyset(query, key_cols, ascending, payload.cursor, limit)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    result = await db.execute(query)
+    return keyset_page(result.mappings().all(), key_cols, ascending, limit)
 
 
 @router.post("/insert")
 async def insert_rows(payload: InsertRequest, db: AsyncSession = Depends(get_db)):
     model = _get_model(payload.table)
+    table = model.__table__
 
     raw_values = payload.values if isinstance(payload.values, list) else [payload.values]
     if not raw_values:
         return {"rows": [], "count": 0, "error": None}
 
-    created_objects = []
-    for item in raw_values:
-        sanitized = _sanitize_payload(model, item)
-        obj = model(**sanitized)
-        db.add(obj)
-        created_objects.append(obj)
-
-    await db.commit()
-
-    if not payload.returning:
-        return {"rows": [], "count": len(created_objects), "error": None}
-
-    for obj in created_objects:
-        await db.refresh(obj)
-
-    rows = _serialize_rows(created_objects)
-    return {"rows": rows, "count": len(rows), "error": None}
+    names, returning_cols = _select_columns(model, "*")
+    stmt = insert(table)
+    if payload.returning:
+        # 여러 행을 한 번에 넣어도 RETURNING 순서가 입력 순서와 같도록 보장합니다.
+        stmt = stmt.returning(*returning_cols, sort_by_parameter_order=True)
+
+    sanitized_rows = [_sanitize_payload(model, item) for item in raw_values]
+    rows: list[dict[str, Any]] = []
+    try:
+        # executemany는 모든 행의 키가 같아야 하므로 연속한 같은 키 묶음끼리 보냅니다.
+        # 드라이버는 이를 다중 행 VALUES로 묶어 보내고, 아주 큰 요청은 청크로 나눠 메모리를 제한합니다.
+        for keys, group in groupby(sanitized_rows, key=lambda row: tuple(row)):
+            group_rows = list(group)
+            if not keys:
+                for _ in group_rows:
+                    result = await db.execute(stmt)
+                    if payload.returning:
+                        rows.extend(serialize_columns(row, names) for row in result.mappings())
+                continue
+            for start in range(0, len(group_rows), INSERT_CHUNK_ROWS):
+                result = await db.execute(stmt, group_rows[start : start + INSERT_CHUNK_ROWS])
+                if payload.returning:
+                    rows.extend(serialize_columns(row, names) for row in result.mappings())
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Insert violates a constraint") from exc
+
+    count = len(rows) if payload.returning else len(sanitized_rows)
+    return {"rows": rows, "count": count, "error": None}
 
 
 @router.post("/update")
 async def update_rows(payload: UpdateRequest, db: AsyncSession = Depends(get_db)):
     model = _get_model(payload.table)
-    query = select(model)
-    query = _apply_filters(query, model, payload.filters, payload.or_filters)
-
-    result = await db.execute(query)
-    rows = list(result.scalars().all())
-
+    table = model.__table__
     sanitized_values = _sanitize_payload(model, payload.values)
-    for row in rows:
-        for key, value in sanitized_values.items():
-            setattr(row, key, value)
-
-    await db.commit()
-
-    if not payload.returning:
-        return {"rows": [], "count": len(rows), "error": None}
+    names, returning_cols = _select_columns(model, "*")
+
+    if not sanitized_values:
+        # 바꿀 값이 없으면 UPDATE 대신 대상 행만 셉니다.
+        if not payload.returning:
+            query = select(func.count()).select_from(model)
+            query = _apply_filters(query, model, payload.filters, payload.or_filters)
+            return {"rows": [], "count": int(await db.scalar(query)), "error": None}
+        query = _apply_filters(
+            select(*returning_cols), model, payload.filters, payload.or_filters
+        )
+        rows = [serialize_columns(row, names) for row in (await db.execute(query)).mappings()]
+        return {"rows": rows, "count": len(rows), "error": None}
+
+    # 행을 ORM 객체로 읽지 않고 UPDATE ... WHERE ... [RETURNING] 한 문장으로 처리합니다.
+    stmt = _apply_filters(
+        update(table).values(sanitized_values), model, payload.filters, payload.or_filters
+    )
+    if payload.returning:
+        stmt = stmt.returning(*returning_cols)
+
+    try:
+        result = await db.execute(stmt)
+        rows = (
+            [serialize_columns(row, names) for row in result.mappings()]
+            if payload.returning
+            else []
+        )
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Update violates a constraint") from exc
 
-    serialized = _serialize_rows(rows)
-    return {"rows": serialized, "count": len(serialized), "error": None}
+    count = len(rows) if payload.returning else result.rowcount
+    return {"rows": rows, "count": count, "error": None}
 
 
 @router.post("/delete")
 async def delete_rows(payload: DeleteRequest, db: AsyncSession = Depends(get_db)):
     model = _get_model(payload.table)
-    query = select(model)
-    query = _apply_filters(query, model, payload.filters, payload.or_filters)
-
-    result = await db.execute(query)
-    rows = list(result.scalars().all())
-
-    serialized = _serialize_rows(rows) if payload.returning else []
-
-    for row in rows:
-        await db.delete(row)
-
+    names, returning_cols = _select_columns(model, "*")
+
+    # DELETE ... WHERE ... [RETURNING] 한 문장으로 지웁니다. 연관 행은 FK의 ON DELETE가 처리합니다.
+    stmt = _apply_filters(
+        delete(model.__table__), model, payload.filters, payload.or_filters
+    )
+    if payload.returning:
+        stmt = stmt.returning(*returning_cols)
+
+    result = await db.execute(stmt)
+    rows = (
+        [serialize_columns(row, names) for row in result.mappings()]
+        if payload.returning
+        else []
+    )
     await db.commit()
 
-    return {"rows": serialized, "count": len(rows), "error": None}
+    count = len(rows) if payload.returning else result.rowcount
+    return {"rows": rows, "count": count, "error": None}
@@ -0,0 +1,360 @@
+import json
+import os
+import uuid
+import zipfile
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import IO, AsyncIterator, Iterator
+from urllib.parse import quote
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from db.models import Problem, ProblemAsset, ProblemSubtask, TestCase
+from db.session import SessionLocal
+from extensions.storage.func import STORAGE_DIR, delete_object, store_fileobj
+from extensions.testCase.func import _read_member, insert_test_cases_streaming
+
+PACKAGE_FORMAT = "code01-problem"
+PACKAGE_VERSION = 1
+# 프론트엔드가 문제 이미지를 올리는 버킷입니다.
+ASSET_BUCKET = "problem-assets"
+
+PACKAGE_MAX_ARCHIVE_BYTES = int(
+    os.getenv("PACKAGE_MAX_ARCHIVE_BYTES", str(4 * 1024 * 1024 * 1024))
+)
+PACKAGE_MAX_MANIFEST_BYTES = 16 * 1024 * 1024
+EXPORT_FETCH_SIZE = int(os.getenv("PACKAGE_EXPORT_FETCH_SIZE", "200"))
+EXPORT_CHUNK_BYTES = 1024 * 1024
+
+# 패키지에 담는 문제 메타데이터입니다. id/작성자/조직은 가져오는 쪽에서 정합니다.
+PROBLEM_FIELDS = (
+    "title",
+    "description",
+    "input_description",
+    "output_description",
+    "sample_inputs",
+    "sample_outputs",
+    "time_limit",
+    "memory_limit",
+    "conditions",
+    "default_code",
+    "grade",
+    "available_languages",
+    "source",
+    "tags",
+    "reference_code",
+    "reference_language",
+)
+TEXT_FIELDS_WITH_URLS = ("description", "input_description", "output_description")
+
+
+class _ZipSink:
+    """ZipFile이 쓰는 바이트를 모아 두었다가 응답 청크로 넘겨 줍니다."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer.extend(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _write_json(archive: zipfile.ZipFile, name: str, payload) -> None:
+    archive.writestr(name, json.dumps(payload, ensure_ascii=False, indent=2))
+
+
+def _write_case(archive: zipfile.ZipFile, name: str, input_text: str, output_text: str) -> None:
+    archive.writestr(f"tests/{name}.in", input_text)
+    archive.writestr(f"tests/{name}.out", output_text)
+
+
+async def export_problem_package(problem_id: int) -> AsyncIterator[bytes]:
+    """
+    문제 메타데이터, 서브태스크, 테스트 케이스, 첨부 파일을 ZIP으로 묶어 조금씩 흘려보냅니다.
+    테스트 케이스는 서버 측 커서로 EXPORT_FETCH_SIZE개씩 읽고, 파일은 청크 단위로 읽습니다.
+    """
+    sink = _ZipSink()
+    # 출력 스트림은 seek가 안 되므로 ZipFile이 data descriptor 방식으로 씁니다.
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+
+    async with SessionLocal() as db:
+        problem = await db.get(Problem, problem_id)
+        if not problem:
+            raise ValueError(f"Problem with ID {problem_id} not found.")
+
+        subtask_rows = await db.execute(
+            select(ProblemSubtask)
+            .where(ProblemSubtask.problem_id == problem_id)
+            .order_by(ProblemSubtask.order_index.asc(), ProblemSubtask.id.asc())
+        )
+        subtasks = list(subtask_rows.scalars().all())
+        subtask_keys = {subtask.id: index for index, subtask in enumerate(subtasks)}
+
+        asset_rows = await db.execute(
+            select(ProblemAsset)
+            .where(ProblemAsset.problem_id == problem_id)
+            .order_by(ProblemAsset.id.asc())
+        )
+        assets = []
+        for index, asset in enumerate(asset_rows.scalars().all()):
+            name = PurePosixPath(asset.path).name or "asset"
+            assets.append(
+                {
+                    "file": f"assets/{index}_{name}",
+                    "source": STORAGE_DIR / ASSET_BUCKET / asset.path,
+                    "url": asset.url,
+                    "path": asset.path,
+                    "section": asset.section,
+                }
+            )
+
+        manifest = {
+            "format": PACKAGE_FORMAT,
+            "version": PACKAGE_VERSION,
+            "exported_at": datetime.utcnow().isoformat(),
+            "problem": {field: getattr(problem, field) for field in PROBLEM_FIELDS},
+            "subtasks": [
+                {
+                    "key": subtask_keys[subtask.id],
+                    "name": subtask.name,
+                    "weight": subtask.weight,
+                    "order_index": subtask.order_index,
+                }
+                for subtask in subtasks
+            ],
+            "assets": [
+                {key: value for key, value in asset.items() if key != "source"}
+                for asset in assets
+            ],
+        }
+        await run_in_threadpool(_write_json, archive, "problem.json", manifest)
+        yield sink.drain()
+
+        tests: list[dict] = []
+        result = await db.stream(
+            select(TestCase.input, TestCase.output, TestCase.subtask_id)
+            .where(TestCase.problem_id == problem_id)
+            .order_by(TestCase.created_at.asc(), TestCase.id.asc())
+            .execution_options(yield_per=EXPORT_FETCH_SIZE)
+        )
+        async for row in result:
+            name = f"{len(tests) + 1:05d}"
+            await run_in_threadpool(_write_case, archive, name, row.input, row.output)
+            tests.append({"name": name, "subtask": subtask_keys.get(row.subtask_id)})
+            data = sink.drain()
+            if data:
+                yield data
+
+    await run_in_threadpool(_write_json, archive, "tests.json", tests)
+    yield sink.drain()
+
+    for asset in assets:
+        source = asset["source"]
+        if not await run_in_threadpool(source.is_file):
+            continue
+        src = await run_in_threadpool(source.open, "rb")
+        # 크기를 미리 알 수 없는 멤버라 2 GiB를 넘어도 쓸 수 있도록 ZIP64 헤더로 씁니다.
+        dst = await run_in_threadpool(archive.open, asset["file"], "w", force_zip64=True)
+        try:
+            while chunk := await run_in_threadpool(src.read, EXPORT_CHUNK_BYTES):
+                await run_in_threadpool(dst.write, chunk)
+                data = sink.drain()
+                if data:
+                    yield data
+        finally:
+            await run_in_threadpool(dst.close)
+            await run_in_threadpool(src.close)
+        yield sink.drain()
+
+    await run_in_threadpool(archive.close)
+    yield sink.drain()
+
+
+def _read_json(archive: zipfile.ZipFile, name: str):
+    try:
+        info = archive.getinfo(name)
+    except KeyError:
+        raise ValueError(f"Package is missing {name}.") from None
+    if info.file_size > PACKAGE_MAX_MANIFEST_BYTES:
+        raise ValueError(f"{name} is too large.")
+    with archive.open(info) as fp:
+        return json.loads(fp.read(PACKAGE_MAX_MANIFEST_BYTES + 1))
+
+
+def _require_object(value, name: str) -> dict:
+    if not isinstance(value, dict):
+        raise ValueError(f"{name} must be a JSON object.")
+    return value
+
+
+def _require_object_list(value, name: str) -> list[dict]:
+    if not isinstance(value, list) or not all(isinstance(item, dict) for item in value):
+        raise ValueError(f"{name} must be a list of JSON objects.")
+    return value
+
+
+def _iter_package_cases(
+    archive: zipfile.ZipFile, tests: list[dict], subtask_ids: dict[int, int]
+) -> Iterator[tuple[str, str, int | None]]:
+    for entry in tests:
+        name = str(entry.get("name") or "")
+        try:
+            input_info = archive.getinfo(f"tests/{name}.in")
+            output_info = archive.getinfo(f"tests/{name}.out")
+        except KeyError:
+            raise ValueError(f"Package is missing test case {name}.") from None
+        input_text = _read_member(archive, input_info)
+        output_text = _read_member(archive, output_info)
+        yield input_text, output_text, subtask_ids.get(entry.get("subtask"))
+
+
+def _encode_path_for_url(path: str) -> str:
+    return "/".join(quote(part) for part in path.split("/"))
+
+
+async def _import_assets(
+    db: AsyncSession,
+    archive: zipfile.ZipFile,
+    problem: Problem,
+    assets: list[dict],
+    base_url: str,
+    stored_paths: list[str],
+) -> dict[str, str]:
+    """
+    첨부 파일을 저장소에 다시 올리고 옛 URL -> 새 URL 매핑을 반환합니다.
+    저장한 경로는 stored_paths에 쌓아 가져오기가 실패하면 되돌릴 수 있게 합니다.
+    """
+    url_map: dict[str, str] = {}
+    for index, asset in enumerate(assets):
+        arcname = str(asset.get("file") or "")
+        try:
+            info = archive.getinfo(arcname)
+        except KeyError:
+            continue
+        name = PurePosixPath(str(asset.get("path") or arcname)).name or "asset"
+        new_path = f"imported/{problem.id}/{index}_{name}"
+        member = await run_in_threadpool(archive.open, info)
+        try:
+            await store_fileobj(db, member, ASSET_BUCKET, new_path, overwrite=True)
+            stored_paths.append(new_path)
+        finally:
+            await run_in_threadpool(member.close)
+
+        new_url = f"{base_url}/uploads/{ASSET_BUCKET}/{_encode_path_for_url(new_path)}"
+        if asset.get("url"):
+            url_map[str(asset["url"])] = new_url
+        db.add(
+            ProblemAsset(
+                problem_id=problem.id,
+                url=new_url,
+                path=new_path,
+                section=asset.get("section"),
+            )
+        )
+    await db.commit()
+    return url_map
+
+
+async def import_problem_package(
+    db: AsyncSession,
+    fileobj: IO[bytes],
+    *,
+    created_by: uuid.UUID,
+    organization_id: int | None,
+    base_url: str,
+) -> dict:
+    """
+    export_problem_package로 만든 ZIP에서 새 문제를 만듭니다.
+    테스트 케이스는 청크 단위 bulk insert로 넣고, 실패하면 만들던 문제를 지웁니다.
+    """
+    try:
+        archive = await run_in_threadpool(zipfile.ZipFile, fileobj)
+    except zipfile.BadZipFile:
+        raise ValueError("File is not a valid ZIP archive.") from None
+
+    try:
+        # JSON 모양이 다르면 AttributeError 등으로 500이 나지 않도록 미리 400으로 거릅니다.
+        manifest = _require_object(
+            await run_in_threadpool(_read_json, archive, "problem.json"), "problem.json"
+        )
+        tests = _require_object_list(
+            await run_in_threadpool(_read_json, archive, "tests.json"), "tests.json"
+        )
+        fields = _require_object(manifest.get("problem") or {}, "problem")
+        subtask_items = _require_object_list(manifest.get("subtasks") or [], "subtasks")
+        assets = _require_object_list(manifest.get("assets") or [], "assets")
+        if manifest.get("format") != PACKAGE_FORMAT:
+            raise ValueError("Not a problem package.")
+        if int(manifest.get("version") or 0) > PACKAGE_VERSION:
+            raise ValueError(f"Unsupported package version: {manifest.get('version')}")
+
+        problem = Problem(
+            **{field: fields[field] for field in PROBLEM_FIELDS if field in fields},
+            created_by=created_by,
+            organization_id=organization_id,
+        )
+        db.add(problem)
+        await db.flush()
+
+        subtask_ids: dict[int, int] = {}
+        for item in subtask_items:
+            subtask = ProblemSubtask(
+                problem_id=problem.id,
+                name=item.get("name") or "",
+                weight=float(item.get("weight") or 0.0),
+                order_index=int(item.get("order_index") or 0),
+            )
+            db.add(subtask)
+            await db.flush()
+            subtask_ids[item.get("key")] = subtask.id
+        await db.commit()
+    except (AttributeError, KeyError, TypeError, ValueError) as exc:
+        await db.rollback()
+        await run_in_threadpool(archive.close)
+        raise ValueError(f"Invalid package: {exc}") from exc
+
+    stored_paths: list[str] = []
+    try:
+        cases = iterate_in_threadpool(_iter_package_cases(archive, tests, subtask_ids))
+        stats = await insert_test_cases_streaming(db, problem.id, cases)
+
+        url_map = await _import_assets(
+            db, archive, problem, assets, base_url, stored_paths
+        )
+        if url_map:
+            for field in TEXT_FIELDS_WITH_URLS:
+                text = getattr(problem, field)
+                if not text:
+                    continue
+                for old_url, new_url in url_map.items():
+                    text = text.replace(old_url, new_url)
+                setattr(problem, field, text)
+            await db.commit()
+    except Exception:
+        await db.rollback()
+        await db.execute(delete(Problem).where(Problem.id == problem.id))
+        await db.commit()
+        # 이미 저장한 첨부 파일은 blob 참조와 파일까지 함께 되돌립니다.
+        for path in stored_paths:
+            await delete_object(db, ASSET_BUCKET, path)
+        raise
+    finally:
+        await run_in_threadpool(archive.close)
+
+    await db.refresh(problem)
+    return {
+        "problem": problem,
+        "test_cases": stats,
+        "subtasks": len(subtask_ids),
+        "assets": len(url_map),
+    }
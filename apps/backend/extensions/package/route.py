@@ -0,0 +1,71 @@
+import uuid
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Organization, Problem, User
+from db.serializers import serialize_problem
+from db.session import get_db
+
+from .func import (
+    PACKAGE_MAX_ARCHIVE_BYTES,
+    export_problem_package,
+    import_problem_package,
+)
+
+router = APIRouter(
+    prefix="/package",
+    tags=["package"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/problems/{problem_id}/export")
+async def export_problem(problem_id: int, db: AsyncSession = Depends(get_db)):
+    # 스트리밍이 시작된 뒤에는 상태 코드를 바꿀 수 없으므로 먼저 확인합니다.
+    problem = await db.get(Problem, problem_id)
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+
+    return StreamingResponse(
+        export_problem_package(problem_id),
+        media_type="application/zip",
+        headers={
+            "content-disposition": f'attachment; filename="problem-{problem_id}.zip"'
+        },
+    )
+
+
+@router.post("/problems/import")
+async def import_problem(
+    request: Request,
+    file: UploadFile = File(...),
+    created_by: uuid.UUID = Form(...),
+    organization_id: int | None = Form(None),
+    db: AsyncSession = Depends(get_db),
+):
+    if file.size is not None and file.size > PACKAGE_MAX_ARCHIVE_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Package is too large (max {PACKAGE_MAX_ARCHIVE_BYTES} bytes)",
+        )
+
+    creator = await db.get(User, created_by)
+    if not creator:
+        raise HTTPException(status_code=404, detail="Creator user not found")
+    if organization_id is not None and not await db.get(Organization, organization_id):
+        raise HTTPException(status_code=404, detail="Organization not found")
+
+    try:
+        result = await import_problem_package(
+            db,
+            file.file,
+            created_by=created_by,
+            organization_id=organization_id,
+            base_url=str(request.base_url).rstrip("/"),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    return {**result, "problem": serialize_problem(result["problem"])}
@@ -1,20 +1,20 @@
+import asyncio
+import hashlib
 import logging
 import os
+import random
+import time
+import uuid
 
 import httpx
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import Problem, ProblemSubmission, TestCase
+from db.models import Problem, ProblemSubmission, ProblemSubtask, TestCase
 from db.session import SessionLocal
 
-# Piston의 설치 버전에 종속되지 않도록 version은 "*"로 요청합니다.
-# (설치된 런타임 중 최신 호환 버전을 자동 선택)
-LANGUAGE_VERSION_MAP = {
-    "c": "*",
-    "cpp": "*",
-    "python": "*",
-    "java": "*",
-}
+from .cache import TTLCache
+from .runtimes import ensure_runtimes, resolve_version
 
 LANGUAGE_FILENAME_MAP = {
     "c": "main.c",
@@ -23,6 +23,29 @@ LANGUAGE_FILENAME_MAP = {
     "java": "Main.java",
 }
 
+# 문제의 time_limit은 CPU 시간에 적용하고, 벽시계 시간은 별도의 넉넉한 상한으로 둡니다.
+# 샌드박스 호스트가 바쁠 때 wall time만 늘어나 정답이 TLE가 되는 것을 막기 위함입니다.
+WALL_TIME_FACTOR = float(os.getenv("RUNNER_WALL_TIME_FACTOR", "3"))
+WALL_TIME_EXTRA_MS = int(os.getenv("RUNNER_WALL_TIME_EXTRA_MS", "2000"))
+# 절대 상한입니다. 최대 CPU 제한(PISTON_RUN_CPU_TIME)보다 충분히 커야 wall 여유가 남고,
+# Piston의 PISTON_RUN_TIMEOUT 이하여야 Piston이 요청을 거부하지 않습니다.
+WALL_TIME_CAP_MS = int(os.getenv("RUNNER_WALL_TIME_CAP_MS", "60000"))
+
+# 제출 없이 입력만 넣어 실행해 보는 경로의 제한입니다. 채점보다 빡빡하게 둡니다.
+CUSTOM_RUN_TIME_LIMIT_MS = int(os.getenv("RUNNER_CUSTOM_TIME_LIMIT_MS", "3000"))
+CUSTOM_RUN_MEMORY_LIMIT_MB = int(os.getenv("RUNNER_CUSTOM_MEMORY_LIMIT_MB", "256"))
+CUSTOM_RUN_OUTPUT_LIMIT_BYTES = int(os.getenv("RUNNER_CUSTOM_OUTPUT_LIMIT_BYTES", "65536"))
+CUSTOM_RUN_MAX_INPUTS = int(os.getenv("RUNNER_CUSTOM_MAX_INPUTS", "10"))
+CUSTOM_RUN_CACHE_TTL_SEC = float(os.getenv("RUNNER_CUSTOM_CACHE_TTL_SEC", "60"))
+
+_custom_run_cache = TTLCache(CUSTOM_RUN_CACHE_TTL_SEC, max_entries=512)
+
+# 첫 실패에서 채점을 멈춥니다. 남은 케이스는 실행하지 않습니다.
+FAIL_FAST = os.getenv("RUNNER_FAIL_FAST", "false").lower() == "true"
+# 케이스 실행 횟수(run_count)는 정렬 힌트일 뿐이라 제출마다 모든 케이스에 쓰지 않습니다.
+# 이 확률로 뽑힌 제출만 실행한 케이스에 1/확률만큼 한 번에 더합니다.
+CASE_STATS_SAMPLE_RATE = float(os.getenv("RUNNER_CASE_STATS_SAMPLE_RATE", "0.1"))
+
 
 def normalize_output(text: str) -> list[str]:
     return [
@@ -43,6 +66,350 @@ def normalize_memory_kb(raw_memory: object) -> float:
     return value / 1024.0
 
 
+def normalize_time_ms(raw_time: object) -> int:
+    try:
+        value = float(raw_time or 0)
+    except (TypeError, ValueError):
+        return 0
+    return max(int(round(value)), 0)
+
+
+def wall_time_limit_ms(cpu_time_limit_ms: int) -> int:
+    generous = max(
+        int(cpu_time_limit_ms * WALL_TIME_FACTOR),
+        cpu_time_limit_ms + WALL_TIME_EXTRA_MS,
+    )
+    return min(generous, max(WALL_TIME_CAP_MS, cpu_time_limit_ms))
+
+
+# stderr_list에서 실행하지 않은 케이스를 구분하는 표시입니다.
+SKIPPED_CASE_STDERR = "Skipped: not judged because an earlier case already failed."
+
+
+def _failed_case(
+    stderr: str,
+    *,
+    is_timeout: bool = False,
+    cpu_ms: int = 0,
+    wall_ms: int = 0,
+) -> dict:
+    return {
+        "stdout": "",
+        "stderr": stderr,
+        "is_correct": False,
+        "is_timeout": is_timeout,
+        "is_memory_over": False,
+        "exit_code": -1,
+        "cpu_ms": cpu_ms,
+        "wall_ms": wall_ms,
+        "memory_kb": 0,
+        "judged": False,
+    }
+
+
+def _skipped_case() -> dict:
+    """실행하지 않은 케이스의 자리 표시 결과입니다. 결과 목록이 케이스 순서와 어긋나지 않게 합니다."""
+    return {
+        "stdout": "",
+        "stderr": SKIPPED_CASE_STDERR,
+        "is_correct": False,
+        "is_timeout": False,
+        "is_memory_over": False,
+        "exit_code": 0,
+        "cpu_ms": 0,
+        "wall_ms": 0,
+        "memory_kb": 0,
+        "judged": False,
+        "skipped": True,
+    }
+
+
+def _case_passed(result: dict) -> bool:
+    return (
+        result["is_correct"]
+        and not result["is_timeout"]
+        and not result.get("is_memory_over", False)
+        and result["exit_code"] == 0
+    )
+
+
+def _failure_rate(test_case: TestCase) -> float:
+    # 실행 이력이 적은 케이스가 0이나 1로 튀지 않도록 보정합니다.
+    # run_count는 표본으로 갱신되므로 fail_count보다 작을 수 있습니다.
+    fail_count = test_case.fail_count or 0
+    run_count = max(test_case.run_count or 0, fail_count)
+    return (fail_count + 1) / (run_count + 2)
+
+
+def order_test_cases(
+    test_cases: list[TestCase],
+    problem: Problem,
+    fail_fast: bool,
+) -> list[TestCase]:
+    """
+    예제와 같은 케이스를 먼저 실행합니다.
+    fail_fast일 때는 나머지를 과거 실패율이 높은 순으로 정렬합니다.
+    """
+    sample_pairs = {
+        (tuple(normalize_output(sample_input)), tuple(normalize_output(sample_output)))
+        for sample_input, sample_output in zip(
+            problem.sample_inputs or [], problem.sample_outputs or []
+        )
+    }
+
+    samples: list[TestCase] = []
+    others: list[TestCase] = []
+    for test_case in test_cases:
+        pair = (
+            tuple(normalize_output(test_case.input)),
+            tuple(normalize_output(test_case.output)),
+        )
+        (samples if pair in sample_pairs else others).append(test_case)
+
+    if fail_fast:
+        others.sort(key=_failure_rate, reverse=True)
+
+    return samples + others
+
+
+async def _record_case_outcomes(
+    db: AsyncSession, outcomes: list[tuple[uuid.UUID, bool]]
+) -> None:
+    """
+    실패한 케이스의 fail_count만 매번 올립니다. 보통 한두 행입니다.
+    run_count는 표본 제출에서만 한 문장으로 갱신해 채점 경로의 쓰기와 행 잠금을 줄입니다.
+    """
+    failed_ids = sorted(case_id for case_id, passed in outcomes if not passed)
+    if failed_ids:
+        await db.execute(
+            update(TestCase)
+            .where(TestCase.id.in_(failed_ids))
+            .values(fail_count=TestCase.fail_count + 1)
+        )
+
+    if CASE_STATS_SAMPLE_RATE <= 0 or random.random() >= CASE_STATS_SAMPLE_RATE:
+        return
+    run_ids = sorted(case_id for case_id, _ in outcomes)
+    if run_ids:
+        await db.execute(
+            update(TestCase)
+            .where(TestCase.id.in_(run_ids))
+            .values(
+                run_count=TestCase.run_count
+                + max(1, round(1 / min(CASE_STATS_SAMPLE_RATE, 1.0)))
+            )
+        )
+
+
+def compute_score(
+    subtask_weights: dict[int, float],
+    subtask_case_counts: dict[int | None, int],
+    subtask_passed_counts: dict[int | None, int],
+    passed_all: bool,
+) -> float:
+    """
+    모든 케이스를 통과한 서브태스크의 가중치 합을 100점 만점으로 환산합니다.
+    케이스가 없는 서브태스크는 점수 계산에서 빠집니다.
+    서브태스크에 묶이지 않은 케이스(키 None)는 평균 가중치를 가진 서브태스크 하나로 봅니다.
+    점수가 걸린 서브태스크가 없으면 전체 정답 여부로 0점 또는 100점입니다.
+    """
+    graded = {
+        subtask_id: weight
+        for subtask_id, weight in subtask_weights.items()
+        if weight > 0 and subtask_case_counts.get(subtask_id, 0) > 0
+    }
+    if not graded:
+        return 100.0 if passed_all else 0.0
+    if subtask_case_counts.get(None, 0) > 0:
+        graded[None] = sum(graded.values()) / len(graded)
+
+    earned = sum(
+        weight
+        for subtask_id, weight in graded.items()
+        if subtask_passed_counts.get(subtask_id, 0) == subtask_case_counts[subtask_id]
+    )
+    return round(earned / sum(graded.values()) * 100.0, 2)
+
+
+class PistonRequestError(Exception):
+    pass
+
+
+async def execute_piston(
+    client: httpx.AsyncClient,
+    *,
+    language: str,
+    version: str,
+    code: str,
+    stdin: str,
+    cpu_time_limit_ms: int,
+    wall_time_limit_ms: int,
+    run_memory_limit_bytes: int,
+    compile_memory_limit_bytes: int,
+) -> dict:
+    """Piston /execute를 호출하고 응답 JSON을 반환합니다."""
+    filename = LANGUAGE_FILENAME_MAP.get(language)
+    if not filename:
+        raise ValueError(f"Unsupported language: {language}")
+    if not code:
+        raise ValueError("Code content is empty.")
+
+    piston_api_url = os.getenv("PISTON_API_URL", "http://piston:2000")
+    payload = {
+        "language": language,
+        "version": version,
+        "files": [{"name": filename, "content": code}],
+        "stdin": stdin,
+        "run_timeout": wall_time_limit_ms,
+        "run_cpu_time": cpu_time_limit_ms,
+        "compile_memory_limit": compile_memory_limit_bytes,
+        "run_memory_limit": run_memory_limit_bytes,
+    }
+
+    response = await client.post(
+        f"{piston_api_url}/api/v2/execute",
+        json=payload,
+        timeout=(wall_time_limit_ms / 1000) + 5,
+    )
+    if response.status_code >= 400:
+        try:
+            err_payload = response.json()
+        except Exception:
+            err_payload = None
+        err_message = err_payload.get("message") if isinstance(err_payload, dict) else None
+        raise PistonRequestError(
+            err_message or f"Piston API request failed ({response.status_code})"
+        )
+
+    result = response.json()
+    if "message" in result:
+        logging.error(f"Piston API message: {result['message']}")
+    return result
+
+
+def _elapsed_ms(started_at: float) -> int:
+    return int(round((time.monotonic() - started_at) * 1000))
+
+
+def _truncate_output(text: str, limit: int) -> tuple[str, bool]:
+    encoded = text.encode("utf-8")
+    if len(encoded) <= limit:
+        return text, False
+    return encoded[:limit].decode("utf-8", errors="ignore"), True
+
+
+def custom_run_result(
+    stdout: str = "",
+    stderr: str = "",
+    *,
+    status: str | None = None,
+    exit_code: int | None = None,
+    cpu_ms: int = 0,
+    wall_ms: int = 0,
+    memory_kb: float = 0.0,
+    truncated: bool = False,
+) -> dict:
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "status": status,
+        "exitCode": exit_code,
+        "cpuMs": cpu_ms,
+        "wallMs": wall_ms,
+        "memoryKb": memory_kb,
+        "truncated": truncated,
+        "cached": False,
+    }
+
+
+async def _run_custom_input(
+    client: httpx.AsyncClient,
+    code: str,
+    language: str,
+    version: str,
+    stdin: str,
+) -> dict:
+    cache_key = hashlib.sha256(
+        "\0".join((language, version, code, stdin)).encode("utf-8")
+    ).hexdigest()
+    cached = _custom_run_cache.get(cache_key)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    memory_limit_bytes = CUSTOM_RUN_MEMORY_LIMIT_MB * 1024 * 1024
+    try:
+        result = await execute_piston(
+            client,
+            language=language,
+            version=version,
+            code=code,
+            stdin=stdin,
+            cpu_time_limit_ms=CUSTOM_RUN_TIME_LIMIT_MS,
+            wall_time_limit_ms=wall_time_limit_ms(CUSTOM_RUN_TIME_LIMIT_MS),
+            run_memory_limit_bytes=memory_limit_bytes,
+            compile_memory_limit_bytes=max(memory_limit_bytes, 512 * 1024 * 1024),
+        )
+    except (PistonRequestError, httpx.HTTPError) as exc:
+        # 샌드박스 오류는 캐시하지 않습니다.
+        return custom_run_result(stderr=str(exc) or type(exc).__name__, status="XX")
+
+    compile_result = result.get("compile") or {}
+    if compile_result.get("code") not in (None, 0):
+        stderr, truncated = _truncate_output(
+            compile_result.get("stderr") or compile_result.get("output") or "",
+            CUSTOM_RUN_OUTPUT_LIMIT_BYTES,
+        )
+        payload = custom_run_result(
+            stderr=stderr,
+            status="CE",
+            exit_code=compile_result.get("code"),
+            truncated=truncated,
+        )
+    else:
+        run_result = result.get("run") or {}
+        stdout, stdout_truncated = _truncate_output(
+            run_result.get("stdout") or "", CUSTOM_RUN_OUTPUT_LIMIT_BYTES
+        )
+        stderr, stderr_truncated = _truncate_output(
+            run_result.get("stderr") or "", CUSTOM_RUN_OUTPUT_LIMIT_BYTES
+        )
+        payload = custom_run_result(
+            stdout,
+            stderr,
+            status=run_result.get("status"),
+            exit_code=run_result.get("code"),
+            cpu_ms=normalize_time_ms(run_result.get("cpu_time")),
+            wall_ms=normalize_time_ms(run_result.get("wall_time")),
+            memory_kb=normalize_memory_kb(run_result.get("memory")),
+            truncated=stdout_truncated or stderr_truncated,
+        )
+
+    _custom_run_cache.set(cache_key, payload)
+    return payload
+
+
+async def run_custom_inputs(code: str, language: str, inputs: list[str]) -> list[dict]:
+    """
+    제출을 만들지 않고 주어진 입력들로 코드를 실행합니다. DB에 접근하지 않습니다.
+    """
+    language_version = "*"
+    if await ensure_runtimes():
+        resolved_version = resolve_version(language)
+        if resolved_version is None:
+            raise ValueError(f"Language runtime is not installed: {language}")
+        language_version = resolved_version
+
+    async with httpx.AsyncClient() as client:
+        return list(
+            await asyncio.gather(
+                *(
+                    _run_custom_input(client, code, language, language_version, stdin)
+                    for stdin in inputs
+                )
+            )
+        )
+
+
 async def _mark_internal_error(pending_id: int, message: str) -> None:
     async with SessionLocal() as db:
         submission = await db.get(ProblemSubmission, pending_id)
@@ -58,8 +425,15 @@ async def run_code_in_background(
     code: str,
     language: str,
     problem_id: int,
+    enqueued_at: float | None = None,
 ):
-    PISTON_API_URL = os.getenv("PISTON_API_URL", "http://piston:2000")
+    # 단계별 소요 시간(ms). 케이스별로는 [piston, compile, run, db] 순서로 저장합니다.
+    # piston은 HTTP 왕복 시간에서 compile/run을 뺀 샌드박스 오버헤드입니다.
+    started_at = time.monotonic()
+    timings: dict = {
+        "queue_ms": int(round((started_at - enqueued_at) * 1000)) if enqueued_at else 0,
+        "cases": [],
+    }
 
     try:
         async with SessionLocal() as db:
@@ -72,6 +446,7 @@ async def run_code_in_background(
                 raise ValueError(f"Submission with ID {pending_id} not found.")
 
             time_limit_ms = 20000 if problem.time_limit is None else problem.time_limit
+            wall_limit_ms = wall_time_limit_ms(time_limit_ms)
             memory_limit_mb = 128 if problem.memory_limit is None else problem.memory_limit
             run_memory_limit_bytes = memory_limit_mb * 1024 * 1024
             # 컴파일 단계는 런타임 메모리 제한보다 여유를 둡니다.
@@ -83,81 +458,95 @@ async def run_code_in_background(
             test_cases = list(test_cases_result.scalars().all())
             if not test_cases:
                 raise ValueError(f"No test cases found for problem {problem_id}.")
+            test_cases = order_test_cases(test_cases, problem, FAIL_FAST)
+
+            subtask_rows = await db.execute(
+                select(ProblemSubtask.id, ProblemSubtask.weight).where(
+                    ProblemSubtask.problem_id == problem_id
+                )
+            )
+            subtask_weights = {
+                subtask_id: float(weight or 0) for subtask_id, weight in subtask_rows.all()
+            }
+            # 서브태스크에 묶이지 않은 케이스는 None 키로 셉니다.
+            subtask_case_counts: dict[int | None, int] = {}
+            for test_case in test_cases:
+                key = (
+                    test_case.subtask_id
+                    if test_case.subtask_id in subtask_weights
+                    else None
+                )
+                subtask_case_counts[key] = subtask_case_counts.get(key, 0) + 1
+            subtask_passed_counts: dict[int | None, int] = {}
+            failed_subtasks: set[int] = set()
+
+            # 설치된 런타임 버전을 고정해서 요청합니다.
+            # (레지스트리를 조회할 수 없을 때만 "*"로 Piston에 맡깁니다.)
+            language_version = "*"
+            if await ensure_runtimes():
+                resolved_version = resolve_version(language)
+                if resolved_version is None:
+                    raise ValueError(f"Language runtime is not installed: {language}")
+                language_version = resolved_version
+                submission.language_version = resolved_version
 
             result_list = []
+            case_outcomes: list[tuple[uuid.UUID, bool]] = []
+            timings["load_ms"] = _elapsed_ms(started_at)
+            judge_started_at = time.monotonic()
 
+            stop_judging = False
             async with httpx.AsyncClient() as client:
                 for index, test_case in enumerate(test_cases):
+                    subtask_id = (
+                        test_case.subtask_id
+                        if test_case.subtask_id in subtask_weights
+                        else None
+                    )
+                    if stop_judging or subtask_id in failed_subtasks:
+                        # 이미 실패한 서브태스크는 0점이므로 남은 케이스를 실행하지 않습니다.
+                        # 결과/타이밍 목록은 케이스 순서대로 인덱싱되므로 자리는 채워 둡니다.
+                        result_list.append(_skipped_case())
+                        timings["cases"].append(None)
+                        submission.cases_done = index + 1
+                        continue
+
+                    compile_ms = 0
+                    run_ms = 0
+                    http_started_at = time.monotonic()
                     try:
-                        filename = LANGUAGE_FILENAME_MAP.get(language)
-                        if not filename:
-                            raise ValueError(f"Unsupported language: {language}")
-                        if not code:
-                            raise ValueError("Code content is empty.")
-
-                        payload = {
-                            "language": language,
-                            "version": LANGUAGE_VERSION_MAP.get(language, "*"),
-                            "files": [{"name": filename, "content": code}],
-                            "stdin": test_case.input,
-                            "run_timeout": time_limit_ms,
-                            "compile_memory_limit": compile_memory_limit_bytes,
-                            "run_memory_limit": run_memory_limit_bytes,
-                        }
-
-                        response = await client.post(
-                            f"{PISTON_API_URL}/api/v2/execute",
-                            json=payload,
-                            timeout=(time_limit_ms / 1000) + 5,
+                        result = await execute_piston(
+                            client,
+                            language=language,
+                            version=language_version,
+                            code=code,
+                            stdin=test_case.input,
+                            cpu_time_limit_ms=time_limit_ms,
+                            wall_time_limit_ms=wall_limit_ms,
+                            run_memory_limit_bytes=run_memory_limit_bytes,
+                            compile_memory_limit_bytes=compile_memory_limit_bytes,
                         )
-                        if response.status_code >= 400:
-                            try:
-                                err_payload = response.json()
-                            except Exception:
-                                err_payload = None
-                            err_message = (
-                                err_payload.get("message")
-                                if isinstance(err_payload, dict)
-                                else None
-                            )
-                            result_list.append(
-                                {
-                                    "stdout": "",
-                                    "stderr": err_message
-                                    or f"Piston API request failed ({response.status_code})",
-                                    "is_correct": False,
-                                    "is_timeout": False,
-                                    "is_memory_over": False,
-                                    "exit_code": -1,
-                                    "runtime_ms": 0,
-                                    "memory_kb": 0,
-                                }
-                            )
-                            submission.cases_done = index + 1
-                            submission.cases_total = len(test_cases)
-                            await db.commit()
-                            continue
-
-                        result = response.json()
-
-                        if "message" in result:
-                            logging.error(f"Piston API message: {result['message']}")
 
                         run_result = result.get("run", {})
+                        compile_result = result.get("compile") or {}
+                        compile_ms = normalize_time_ms(compile_result.get("wall_time"))
+                        run_ms = normalize_time_ms(run_result.get("wall_time"))
                         stdout = run_result.get("stdout", "").strip()
                         stderr = run_result.get("stderr", "")
                         exit_code = run_result.get("code", 0)
                         status = run_result.get("status")
                         memory_bytes = run_result.get("memory") or 0
                         memory_kb = normalize_memory_kb(memory_bytes)
-                        wall_time = run_result.get("wall_time", 0)
+                        cpu_ms = normalize_time_ms(run_result.get("cpu_time"))
+                        wall_ms = normalize_time_ms(run_result.get("wall_time"))
 
                         expected_output = normalize_output(test_case.output)
                         actual_output = normalize_output(stdout)
 
                         is_correct = expected_output == actual_output
 
-                        is_timeout = status == "TO"
+                        # TO는 CPU 제한 또는 wall 상한 중 하나에 걸렸다는 뜻입니다.
+                        is_timeout = status == "TO" or cpu_ms > time_limit_ms
                         is_memory_exceeded = status == ""
 
                         result_list.append(
@@ -168,40 +557,58 @@ async def run_code_in_background(
                                 "is_timeout": is_timeout,
                                 "is_memory_over": is_memory_exceeded,
                                 "exit_code": exit_code,
-                                "runtime_ms": wall_time,
+                                "cpu_ms": cpu_ms,
+                                "wall_ms": wall_ms,
                                 "memory_kb": memory_kb,
+                                "judged": True,
                             }
                         )
 
+                    except PistonRequestError as api_err:
+                        result_list.append(_failed_case(str(api_err)))
                     except httpx.ReadTimeout:
                         result_list.append(
-                            {
-                                "stdout": "",
-                                "stderr": "Request to Piston API timed out.",
-                                "is_correct": False,
-                                "is_timeout": True,
-                                "exit_code": -1,
-                                "runtime_ms": time_limit_ms,
-                                "memory_kb": 0,
-                            }
+                            _failed_case(
+                                "Request to Piston API timed out.",
+                                is_timeout=True,
+                                cpu_ms=time_limit_ms,
+                                wall_ms=wall_limit_ms,
+                            )
                         )
                     except Exception as api_err:
                         logging.error(f"Piston API call failed: {api_err}")
-                        result_list.append(
-                            {
-                                "stdout": "",
-                                "stderr": str(api_err),
-                                "is_correct": False,
-                                "is_timeout": False,
-                                "exit_code": -1,
-                                "runtime_ms": 0,
-                                "memory_kb": 0,
-                            }
-                        )
+                        result_list.append(_failed_case(str(api_err)))
+                    http_ms = _elapsed_ms(http_started_at)
 
+                    db_started_at = time.monotonic()
                     submission.cases_done = index + 1
                     submission.cases_total = len(test_cases)
                     await db.commit()
+                    timings["cases"].append(
+                        [
+                            max(http_ms - compile_ms - run_ms, 0),
+                            compile_ms,
+                            run_ms,
+                            _elapsed_ms(db_started_at),
+                        ]
+                    )
+
+                    last_result = result_list[-1]
+                    case_passed = _case_passed(last_result)
+                    if last_result["judged"]:
+                        case_outcomes.append((test_case.id, case_passed))
+                    if case_passed:
+                        subtask_passed_counts[subtask_id] = (
+                            subtask_passed_counts.get(subtask_id, 0) + 1
+                        )
+                    elif subtask_id is not None:
+                        failed_subtasks.add(subtask_id)
+                    elif FAIL_FAST:
+                        stop_judging = True
+
+            timings["judge_ms"] = _elapsed_ms(judge_started_at)
+            finalize_started_at = time.monotonic()
+            await _record_case_outcomes(db, case_outcomes)
 
             is_correct_all = all(r["is_correct"] for r in result_list)
             is_time_limit_exceeded = any(r["is_timeout"] for r in result_list)
@@ -225,14 +632,19 @@ async def run_code_in_background(
             elif is_correct_all:
                 status_code = 1  # Accepted
 
-            max_runtime_ms = (
-                max([r.get("runtime_ms", 0) for r in result_list]) if result_list else 0
-            )
+            max_cpu_ms = max([r.get("cpu_ms", 0) for r in result_list]) if result_list else 0
+            max_wall_ms = max([r.get("wall_ms", 0) for r in result_list]) if result_list else 0
             max_memory_kb = (
                 max([r.get("memory_kb", 0) for r in result_list]) if result_list else 0
             )
 
             submission.passed_all = status_code == 1
+            submission.score = compute_score(
+                subtask_weights,
+                subtask_case_counts,
+                subtask_passed_counts,
+                submission.passed_all,
+            )
             submission.stdout_list = [r["stdout"] for r in result_list]
             submission.stderr_list = [r["stderr"] for r in result_list]
             submission.passed_time_limit = not is_time_limit_exceeded
@@ -240,7 +652,14 @@ async def run_code_in_background(
             submission.is_correct = is_correct_all
             submission.status_code = status_code
             submission.memory_kb = max_memory_kb
-            submission.time_ms = max_runtime_ms
+            submission.time_ms = max_cpu_ms
+            submission.wall_time_ms = max_wall_ms
+
+            # 마지막 commit 자체의 시간은 같은 commit에 담을 수 없어 제외됩니다.
+            timings["finalize_ms"] = _elapsed_ms(finalize_started_at)
+            timings["db_ms"] = sum(case[3] for case in timings["cases"] if case)
+            timings["total_ms"] = timings["queue_ms"] + _elapsed_ms(started_at)
+            submission.timings = timings
 
             await db.commit()
 
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .func import LANGUAGE_FILENAME_MAP
+
+MAX_CODE_BYTES = int(os.getenv("RUNNER_MAX_CODE_BYTES", str(64 * 1024)))
+PREFLIGHT_WORKERS = int(os.getenv("RUNNER_PREFLIGHT_WORKERS", "2"))
+PREFLIGHT_TIMEOUT_SEC = float(os.getenv("RUNNER_PREFLIGHT_TIMEOUT_SEC", "2"))
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # 깊게 중첩된 코드로 compile()이 죽더라도 API 프로세스는 영향을 받지 않습니다.
+        # fork는 이벤트 루프와 DB 커넥션 소켓까지 복제하므로 forkserver로 깨끗한 프로세스를 띄웁니다.
+        _pool = ProcessPoolExecutor(
+            max_workers=PREFLIGHT_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _pool
+
+
+def shutdown_preflight_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _compile_python(code: str) -> str | None:
+    filename = LANGUAGE_FILENAME_MAP["python"]
+    try:
+        # 실제 파일명을 넘기면 CPython이 작업 디렉토리의 같은 이름 파일에서 에러 줄을 읽습니다.
+        compile(code, f"<{filename}>", "exec")
+    except SyntaxError as exc:
+        lines = [f'  File "{filename}", line {exc.lineno}']
+        source_lines = code.splitlines()
+        if exc.lineno and 0 < exc.lineno <= len(source_lines):
+            lines.append(f"    {source_lines[exc.lineno - 1].strip()}")
+        lines.append(f"{type(exc).__name__}: {exc.msg}")
+        return "\n".join(lines)
+    except (ValueError, RecursionError, MemoryError) as exc:
+        return f"{type(exc).__name__}: {exc}"
+    return None
+
+
+def _matches_backend_python(language_version: str | None) -> bool:
+    """채점 런타임이 백엔드와 같은 Python 마이너 버전인지 확인합니다."""
+    if not language_version:
+        return False
+    try:
+        major_minor = tuple(int(part) for part in language_version.split(".")[:2])
+    except ValueError:
+        return False
+    return major_minor == sys.version_info[:2]
+
+
+async def preflight_check(
+    code: str,
+    language: str,
+    available_languages: list[str] | None,
+    language_version: str | None = None,
+) -> str | None:
+    """
+    샌드박스로 보내기 전에 제출을 검사합니다.
+    잘못된 요청이면 ValueError를, 컴파일 에러면 에러 메시지를 반환합니다.
+    Python 문법 검사는 language_version이 백엔드 인터프리터와 같은 버전일 때만 합니다.
+    버전이 다르면 새 문법(PEP 701 f-string 등)을 잘못 거부할 수 있어 Piston의 compile 단계에 맡깁니다.
+    """
+    if language not in LANGUAGE_FILENAME_MAP:
+        raise ValueError(f"Unsupported language: {language}")
+    if available_languages and language not in available_languages:
+        raise ValueError(f"Language is not allowed for this problem: {language}")
+    if not code or not code.strip():
+        raise ValueError("Code content is empty.")
+    if len(code.encode("utf-8")) > MAX_CODE_BYTES:
+        raise ValueError(f"Code is too large (max {MAX_CODE_BYTES} bytes).")
+
+    if language != "python" or not _matches_backend_python(language_version):
+        return None
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(_get_pool(), _compile_python, code),
+            timeout=PREFLIGHT_TIMEOUT_SEC,
+        )
+    except BrokenProcessPool as exc:
+        logging.error(f"Python preflight pool is broken, recreating: {exc!r}")
+        shutdown_preflight_pool()
+        return None
+    except Exception as exc:
+        # 사전 검사에 실패해도 채점은 샌드박스에 맡깁니다.
+        logging.error(f"Python preflight check failed: {exc!r}")
+        return None
@@ -1,21 +1,42 @@
+import os
+import time
 import uuid
 from datetime import datetime, timedelta, timezone
+from typing import Literal
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
-from pydantic import BaseModel
-from sqlalchemy import select
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy import Float, column, delete, func, select, true
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import (
     OrganizationMember,
+    Problem,
     ProblemSubmission,
     Quiz,
     QuizAttempt,
     QuizProblem,
+    SubmissionIdempotencyKey,
 )
 from db.session import get_db
 
-from .func import run_code_in_background
+from .func import (
+    CUSTOM_RUN_MAX_INPUTS,
+    custom_run_result,
+    run_code_in_background,
+    run_custom_inputs,
+)
+from .preflight import preflight_check, shutdown_preflight_pool
+from .runtimes import (
+    ensure_runtimes,
+    installed_runtimes,
+    resolve_version,
+    runtimes_loaded,
+    start_runtime_refresh,
+    stop_runtime_refresh,
+)
 
 
 class ProblemSubmissionRequest(BaseModel):
@@ -27,6 +48,27 @@ class ProblemSubmissionRequest(BaseModel):
     quizId: int | None = None
 
 
+class CustomRunRequest(BaseModel):
+    code: str
+    language: str
+    stdin: str = ""
+    sampleInputs: list[str] = Field(default_factory=list)
+
+
+IDEMPOTENCY_KEY_TTL_SEC = int(os.getenv("RUNNER_IDEMPOTENCY_TTL_SEC", "86400"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+DUPLICATE_SUBMISSION_MESSAGE = "Duplicate request; returning the original submission."
+
+TIMING_STAGES = ("queue_ms", "load_ms", "judge_ms", "db_ms", "finalize_ms", "total_ms")
+# timings["cases"]의 각 원소는 이 순서의 배열(건너뛴 케이스는 null)입니다. piston_ms는 HTTP 왕복에서 compile/run을 뺀 오버헤드입니다.
+CASE_TIMING_STAGES = ("piston_ms", "compile_ms", "run_ms", "db_ms")
+TIMING_PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def _percentile_key(percentile: float) -> str:
+    return f"p{int(percentile * 100)}"
+
+
 def _to_utc(value: datetime | None) -> datetime | None:
     if value is None:
         return None
@@ -35,6 +77,92 @@ def _to_utc(value: datetime | None) -> datetime | None:
     return value.astimezone(timezone.utc)
 
 
+def _submission_response(submission: ProblemSubmission, message: str) -> dict:
+    return {
+        "message": message,
+        "pendingId": submission.id,
+        "statusCode": submission.status_code,
+        "quizAttemptStartedAt": submission.quiz_attempt_started_at.isoformat()
+        if submission.quiz_attempt_started_at
+        else None,
+    }
+
+
+async def _find_idempotent_submission(
+    db: AsyncSession, user_id: uuid.UUID, key: str
+) -> ProblemSubmission | None:
+    row = await db.execute(
+        select(ProblemSubmission)
+        .join(
+            SubmissionIdempotencyKey,
+            SubmissionIdempotencyKey.submission_id == ProblemSubmission.id,
+        )
+        .where(
+            SubmissionIdempotencyKey.user_id == user_id,
+            SubmissionIdempotencyKey.key == key,
+            SubmissionIdempotencyKey.expires_at > datetime.now(timezone.utc),
+        )
+    )
+    return row.scalar_one_or_none()
+
+
+async def _load_admission_context(
+    db: AsyncSession,
+    problem_id: int,
+    quiz_id: int | None,
+    user_id: uuid.UUID,
+) -> dict | None:
+    """
+    제출 허용 여부 판단에 필요한 값을 한 번의 쿼리로 가져옵니다.
+    문제가 없으면 None, 퀴즈가 없으면 quiz_id가 None인 dict를 반환합니다.
+    """
+    if quiz_id is None:
+        row = await db.execute(
+            select(Problem.available_languages).where(Problem.id == problem_id)
+        )
+        mapping = row.mappings().one_or_none()
+        return dict(mapping) if mapping is not None else None
+
+    is_member = (
+        select(OrganizationMember.organization_id)
+        .where(
+            OrganizationMember.organization_id == Quiz.organization_id,
+            OrganizationMember.user_id == user_id,
+        )
+        .exists()
+    )
+    in_pool = (
+        select(QuizProblem.id)
+        .where(QuizProblem.quiz_id == Quiz.id, QuizProblem.problem_id == Problem.id)
+        .exists()
+    )
+    attempt_started_at = (
+        select(QuizAttempt.started_at)
+        .where(QuizAttempt.quiz_id == Quiz.id, QuizAttempt.user_id == user_id)
+        .scalar_subquery()
+    )
+
+    row = await db.execute(
+        select(
+            Problem.available_languages,
+            Quiz.id.label("quiz_id"),
+            Quiz.published_at,
+            Quiz.start_at,
+            Quiz.end_at,
+            Quiz.time_limit_sec,
+            Quiz.global_problem_id,
+            is_member.label("is_member"),
+            in_pool.label("in_pool"),
+            attempt_started_at.label("attempt_started_at"),
+        )
+        .select_from(Problem)
+        .outerjoin(Quiz, Quiz.id == quiz_id)
+        .where(Problem.id == problem_id)
+    )
+    mapping = row.mappings().one_or_none()
+    return dict(mapping) if mapping is not None else None
+
+
 router = APIRouter(
     prefix="/runner",
     tags=["runner"],
@@ -42,15 +170,168 @@ router = APIRouter(
 )
 
 
+@router.on_event("startup")
+async def startup_event():
+    start_runtime_refresh()
+
+
+@router.on_event("shutdown")
+async def shutdown_event():
+    await stop_runtime_refresh()
+    shutdown_preflight_pool()
+
+
 @router.get("/")
 async def root():
     return {"message": "Hello, Runner!"}
 
 
+@router.get("/runtimes")
+async def list_runtimes():
+    return {"loaded": runtimes_loaded(), "runtimes": installed_runtimes()}
+
+
+@router.get("/stats/timings")
+async def timing_stats(
+    group_by: Literal["language", "problem"] = "language",
+    problem_id: int | None = None,
+    language: str | None = None,
+    since_hours: int = Query(default=168, ge=1, le=24 * 90),
+    db: AsyncSession = Depends(get_db),
+):
+    group_col = (
+        ProblemSubmission.language
+        if group_by == "language"
+        else ProblemSubmission.problem_id
+    )
+
+    def _apply_scope(query):
+        query = query.where(
+            ProblemSubmission.timings.is_not(None),
+            ProblemSubmission.submitted_at
+            >= datetime.now(timezone.utc) - timedelta(hours=since_hours),
+        )
+        if problem_id is not None:
+            query = query.where(ProblemSubmission.problem_id == problem_id)
+        if language is not None:
+            query = query.where(ProblemSubmission.language == language)
+        return query.group_by(group_col).order_by(group_col)
+
+    aggregates = []
+    for stage in TIMING_STAGES:
+        stage_value = ProblemSubmission.timings[stage].astext.cast(Float)
+        for percentile in TIMING_PERCENTILES:
+            aggregates.append(
+                func.percentile_cont(percentile)
+                .within_group(stage_value)
+                .label(f"{stage}_{_percentile_key(percentile)}")
+            )
+
+    rows = await db.execute(
+        _apply_scope(
+            select(group_col.label("key"), func.count().label("count"), *aggregates)
+        )
+    )
+
+    # 케이스별 단계는 배열을 펼쳐 케이스 단위로 백분위를 냅니다.
+    case_timing = (
+        func.jsonb_array_elements(ProblemSubmission.timings["cases"])
+        .table_valued(column("value", JSONB))
+        .lateral("case_timing")
+    )
+    case_aggregates = []
+    for index, stage in enumerate(CASE_TIMING_STAGES):
+        stage_value = case_timing.c.value[index].astext.cast(Float)
+        for percentile in TIMING_PERCENTILES:
+            case_aggregates.append(
+                func.percentile_cont(percentile)
+                .within_group(stage_value)
+                .label(f"{stage}_{_percentile_key(percentile)}")
+            )
+    case_rows = await db.execute(
+        _apply_scope(
+            select(
+                group_col.label("key"),
+                func.count().label("case_count"),
+                *case_aggregates,
+            )
+            .select_from(ProblemSubmission)
+            .join(case_timing, true())
+            .where(func.jsonb_typeof(ProblemSubmission.timings["cases"]) == "array")
+            # 건너뛴 케이스는 null로 기록됩니다.
+            .where(func.jsonb_typeof(case_timing.c.value) == "array")
+        )
+    )
+    case_stats = {row["key"]: row for row in case_rows.mappings().all()}
+
+    items = []
+    for row in rows.mappings().all():
+        case_row = case_stats.get(row["key"])
+        items.append(
+            {
+                "key": row["key"],
+                "count": row["count"],
+                "stages": {
+                    stage: {
+                        _percentile_key(p): row[f"{stage}_{_percentile_key(p)}"]
+                        for p in TIMING_PERCENTILES
+                    }
+                    for stage in TIMING_STAGES
+                },
+                "case_count": case_row["case_count"] if case_row else 0,
+                "case_stages": {
+                    stage: {
+                        _percentile_key(p): (
+                            case_row[f"{stage}_{_percentile_key(p)}"] if case_row else None
+                        )
+                        for p in TIMING_PERCENTILES
+                    }
+                    for stage in CASE_TIMING_STAGES
+                },
+            }
+        )
+
+    return {"group_by": group_by, "since_hours": since_hours, "items": items}
+
+
+async def _judge_language_version(language: str) -> str | None:
+    """Piston이 이 언어를 실행할 버전입니다. 레지스트리를 조회할 수 없으면 None입니다."""
+    if not await ensure_runtimes():
+        return None
+    return resolve_version(language)
+
+
+@router.post("/run")
+async def run_custom(payload: CustomRunRequest):
+    inputs = payload.sampleInputs or [payload.stdin]
+    if len(inputs) > CUSTOM_RUN_MAX_INPUTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many inputs (max {CUSTOM_RUN_MAX_INPUTS}).",
+        )
+
+    try:
+        compile_error = await preflight_check(
+            payload.code,
+            payload.language,
+            None,
+            await _judge_language_version(payload.language),
+        )
+        if compile_error is not None:
+            results = [custom_run_result(stderr=compile_error, status="CE") for _ in inputs]
+        else:
+            results = await run_custom_inputs(payload.code, payload.language, inputs)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    return {"results": results}
+
+
 @router.post("/")
 async def run_code(
     problem_submission: ProblemSubmissionRequest,
     background_tasks: BackgroundTasks,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -58,73 +339,87 @@ async def run_code(
     except ValueError as exc:
         raise HTTPException(status_code=400, detail="Invalid userId") from exc
 
-    quiz_id: int | None = None
+    idempotency_key = (idempotency_key or "").strip() or None
+    if idempotency_key is not None:
+        if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+        # 같은 키로 다시 들어온 요청은 채점 큐에 넣지 않고 처음 제출을 돌려줍니다.
+        existing = await _find_idempotent_submission(db, user_id, idempotency_key)
+        if existing is not None:
+            return _submission_response(existing, DUPLICATE_SUBMISSION_MESSAGE)
+
+    if runtimes_loaded() and resolve_version(problem_submission.language) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Language runtime is not installed: {problem_submission.language}",
+        )
+
+    quiz_id = (
+        int(problem_submission.quizId) if problem_submission.quizId is not None else None
+    )
     quiz_attempt_started_at: datetime | None = None
 
-    if problem_submission.quizId is not None:
-        quiz_id = int(problem_submission.quizId)
-        quiz = await db.get(Quiz, quiz_id)
-        if quiz is None:
+    admission = await _load_admission_context(
+        db, int(problem_submission.problemId), quiz_id, user_id
+    )
+    if admission is None:
+        raise HTTPException(status_code=404, detail="Problem not found")
+
+    if quiz_id is not None:
+        if admission["quiz_id"] is None:
             raise HTTPException(status_code=404, detail="Quiz not found")
 
         now = datetime.now(timezone.utc)
 
-        member_row = await db.execute(
-            select(OrganizationMember.organization_id).where(
-                OrganizationMember.organization_id == quiz.organization_id,
-                OrganizationMember.user_id == user_id,
-            )
-        )
-        if member_row.scalar_one_or_none() is None:
+        if not admission["is_member"]:
             raise HTTPException(status_code=403, detail="Quiz access denied")
 
-        published_at = _to_utc(quiz.published_at)
-        start_at = _to_utc(quiz.start_at)
-        end_at = _to_utc(quiz.end_at)
+        published_at = _to_utc(admission["published_at"])
+        start_at = _to_utc(admission["start_at"])
+        end_at = _to_utc(admission["end_at"])
 
         if published_at is not None and now < published_at:
             raise HTTPException(status_code=403, detail="Quiz is not published yet")
         if start_at is not None and now < start_at:
             raise HTTPException(status_code=403, detail="Quiz has not started yet")
 
-        quiz_problem_row = await db.execute(
-            select(QuizProblem.id).where(
-                QuizProblem.quiz_id == quiz.id,
-                QuizProblem.problem_id == problem_submission.problemId,
-            )
-        )
-        in_pool = quiz_problem_row.scalar_one_or_none() is not None
+        global_problem_id = admission["global_problem_id"]
         in_legacy_pool = (
-            quiz.global_problem_id is not None
-            and int(quiz.global_problem_id) == int(problem_submission.problemId)
+            global_problem_id is not None
+            and int(global_problem_id) == int(problem_submission.problemId)
         )
-        if not in_pool and not in_legacy_pool:
+        if not admission["in_pool"] and not in_legacy_pool:
             raise HTTPException(status_code=403, detail="Problem is not assigned to this quiz")
 
-        quiz_attempt_row = await db.execute(
-            select(QuizAttempt.started_at).where(
-                QuizAttempt.quiz_id == quiz.id,
-                QuizAttempt.user_id == user_id,
-            )
-        )
-        quiz_attempt_started_at = _to_utc(quiz_attempt_row.scalar_one_or_none())
+        quiz_attempt_started_at = _to_utc(admission["attempt_started_at"])
         if quiz_attempt_started_at is None:
             raise HTTPException(
                 status_code=403,
                 detail="퀴즈 입장 후 제출할 수 있습니다. 퀴즈 페이지에서 먼저 입장해 주세요.",
             )
 
+        time_limit_sec = admission["time_limit_sec"]
         effective_deadlines: list[datetime] = []
         if end_at is not None:
             effective_deadlines.append(end_at)
-        if isinstance(quiz.time_limit_sec, int) and quiz.time_limit_sec > 0:
+        if isinstance(time_limit_sec, int) and time_limit_sec > 0:
             effective_deadlines.append(
-                quiz_attempt_started_at + timedelta(seconds=int(quiz.time_limit_sec))
+                quiz_attempt_started_at + timedelta(seconds=int(time_limit_sec))
             )
 
         if effective_deadlines and now > min(effective_deadlines):
             raise HTTPException(status_code=403, detail="Quiz submission window has ended")
 
+    try:
+        compile_error = await preflight_check(
+            problem_submission.code,
+            problem_submission.language,
+            admission["available_languages"],
+            await _judge_language_version(problem_submission.language),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
     inserted = ProblemSubmission(
         user_id=user_id,
         problem_id=problem_submission.problemId,
@@ -136,8 +431,10 @@ async def run_code(
         stdout_list=[],
         stderr_list=[],
         time_ms=0,
+        wall_time_ms=0,
         memory_kb=0.0,
         passed_all=False,
+        score=0.0,
         is_correct=False,
         passed_time_limit=False,
         passed_memory_limit=False,
@@ -146,22 +443,62 @@ async def run_code(
         cases_done=0,
     )
 
+    if compile_error is not None:
+        # 사전 검사에서 걸러진 제출은 샌드박스를 거치지 않고 바로 판정합니다.
+        inserted.status_code = 6  # CompileError
+        inserted.stderr_list = [compile_error]
+        inserted.passed_time_limit = True
+        inserted.passed_memory_limit = True
+
     db.add(inserted)
-    await db.commit()
+    if idempotency_key is not None:
+        now = datetime.now(timezone.utc)
+        # 만료된 키는 같은 사용자가 새 키를 쓸 때 함께 정리합니다.
+        await db.execute(
+            delete(SubmissionIdempotencyKey).where(
+                SubmissionIdempotencyKey.user_id == user_id,
+                SubmissionIdempotencyKey.expires_at <= now,
+            )
+        )
+        await db.flush()
+        db.add(
+            SubmissionIdempotencyKey(
+                user_id=user_id,
+                key=idempotency_key,
+                submission_id=inserted.id,
+                created_at=now,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL_SEC),
+            )
+        )
+
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        # 동시에 들어온 같은 키의 요청이 먼저 커밋된 경우입니다.
+        existing = (
+            await _find_idempotent_submission(db, user_id, idempotency_key)
+            if idempotency_key is not None
+            else None
+        )
+        if existing is None:
+            raise HTTPException(status_code=409, detail="Submission conflict") from exc
+        return _submission_response(existing, DUPLICATE_SUBMISSION_MESSAGE)
     await db.refresh(inserted)
 
-    background_tasks.add_task(
-        run_code_in_background,
-        int(inserted.id),
-        problem_submission.code,
-        problem_submission.language,
-        int(problem_submission.problemId),
-    )
+    if compile_error is None:
+        background_tasks.add_task(
+            run_code_in_background,
+            int(inserted.id),
+            problem_submission.code,
+            problem_submission.language,
+            int(problem_submission.problemId),
+            time.monotonic(),
+        )
 
-    return {
-        "message": "Code is being processed in the background.",
-        "pendingId": inserted.id,
-        "quizAttemptStartedAt": inserted.quiz_attempt_started_at.isoformat()
-        if inserted.quiz_attempt_started_at
-        else None,
-    }
+    return _submission_response(
+        inserted,
+        "Code is being processed in the background."
+        if compile_error is None
+        else "Code failed the preflight check.",
+    )
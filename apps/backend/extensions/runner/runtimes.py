@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+
+import httpx
+
+# 우리 쪽 언어 키 -> Piston 런타임 이름/별칭 후보
+LANGUAGE_RUNTIME_ALIASES = {
+    "c": ("c", "gcc"),
+    "cpp": ("c++", "cpp", "g++"),
+    "python": ("python", "python3", "py"),
+    "java": ("java",),
+}
+
+RUNTIME_REFRESH_INTERVAL_SEC = int(os.getenv("PISTON_RUNTIME_REFRESH_SEC", "300"))
+
+_resolved_versions: dict[str, str] = {}
+_loaded = False
+_refresh_lock = asyncio.Lock()
+_refresh_task: asyncio.Task | None = None
+
+
+def _version_key(version: str) -> tuple[int, ...]:
+    parts: list[int] = []
+    for part in version.split("."):
+        digits = "".join(ch for ch in part if ch.isdigit())
+        parts.append(int(digits) if digits else 0)
+    return tuple(parts)
+
+
+def _pick_versions(runtimes: list[dict]) -> dict[str, str]:
+    resolved: dict[str, str] = {}
+    for language, candidates in LANGUAGE_RUNTIME_ALIASES.items():
+        versions = [
+            str(runtime.get("version"))
+            for runtime in runtimes
+            if runtime.get("version")
+            and (
+                runtime.get("language") in candidates
+                or any(alias in candidates for alias in runtime.get("aliases") or [])
+            )
+        ]
+        if versions:
+            resolved[language] = max(versions, key=_version_key)
+    return resolved
+
+
+async def refresh_runtimes() -> dict[str, str]:
+    """Piston /runtimes를 조회해 언어별 설치 버전을 고정합니다."""
+    global _loaded
+
+    piston_api_url = os.getenv("PISTON_API_URL", "http://piston:2000")
+    async with _refresh_lock:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{piston_api_url}/api/v2/runtimes", timeout=10)
+            response.raise_for_status()
+            runtimes = response.json()
+
+        resolved = _pick_versions(runtimes if isinstance(runtimes, list) else [])
+        _resolved_versions.clear()
+        _resolved_versions.update(resolved)
+        _loaded = True
+
+    logging.info(f"Resolved Piston runtimes: {resolved}")
+    return dict(resolved)
+
+
+async def ensure_runtimes() -> bool:
+    """레지스트리가 비어 있으면 한 번 더 조회합니다. 조회 가능 여부를 반환합니다."""
+    if _loaded:
+        return True
+    try:
+        await refresh_runtimes()
+    except Exception as exc:
+        logging.error(f"Failed to resolve Piston runtimes: {exc}")
+    return _loaded
+
+
+def runtimes_loaded() -> bool:
+    return _loaded
+
+
+def resolve_version(language: str) -> str | None:
+    return _resolved_versions.get(language)
+
+
+def installed_runtimes() -> dict[str, str]:
+    return dict(_resolved_versions)
+
+
+async def _refresh_loop() -> None:
+    while True:
+        try:
+            await refresh_runtimes()
+        except Exception as exc:
+            logging.error(f"Failed to refresh Piston runtimes: {exc}")
+        await asyncio.sleep(RUNTIME_REFRESH_INTERVAL_SEC)
+
+
+def start_runtime_refresh() -> None:
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop_runtime_refresh() -> None:
+    global _refresh_task
+    if _refresh_task is None:
+        return
+    _refresh_task.cancel()
+    try:
+        await _refresh_task
+    except asyncio.CancelledError:
+        pass
+    _refresh_task = None
@@ -0,0 +1,149 @@
+import gzip
+import logging
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # brotli가 없으면 gzip만 만듭니다.
+    brotli = None
+
+COMPRESS_WORKERS = int(os.getenv("STORAGE_COMPRESS_WORKERS", "2"))
+COMPRESS_MIN_BYTES = int(os.getenv("STORAGE_COMPRESS_MIN_BYTES", "1024"))
+# 원본 대비 이 비율보다 작아질 때만 압축본을 남깁니다.
+COMPRESS_MAX_RATIO = float(os.getenv("STORAGE_COMPRESS_MAX_RATIO", "0.9"))
+COMPRESS_CHUNK_BYTES = 1024 * 1024
+
+# 선호 순서대로 나열합니다.
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+COMPRESSIBLE_MEDIA_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+}
+COMPRESSIBLE_SUFFIXES = {".in", ".out", ".ans", ".md", ".csv", ".tsv", ".log"}
+
+# zlib/brotli는 압축 중 GIL을 놓기 때문에 스레드 풀로 충분합니다.
+_executor: ThreadPoolExecutor | None = None
+
+
+def available_encodings() -> list[str]:
+    return [name for name in ENCODING_SUFFIXES if name != "br" or brotli is not None]
+
+
+def is_compressible(path: str, content_type: str | None = None) -> bool:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if not media_type or media_type == "application/octet-stream":
+        media_type = (mimetypes.guess_type(path)[0] or "").lower()
+    if media_type.startswith("text/") or media_type in COMPRESSIBLE_MEDIA_TYPES:
+        return True
+    return Path(path).suffix.lower() in COMPRESSIBLE_SUFFIXES
+
+
+def variant_path(path: Path, encoding: str) -> Path:
+    return path.with_name(path.name + ENCODING_SUFFIXES[encoding])
+
+
+def sibling_variant_path(path: Path, encoding: str) -> Path:
+    # 논리 경로 옆의 압축본은 점으로 시작해 /uploads에서 직접 보이지 않습니다.
+    return path.with_name(f".{path.name}{ENCODING_SUFFIXES[encoding]}")
+
+
+def _compress_file(source: Path, target: Path, encoding: str) -> int:
+    temp = target.with_name(f".{target.name}.{os.urandom(4).hex()}.part")
+    try:
+        with source.open("rb") as src:
+            if encoding == "gzip":
+                with gzip.GzipFile(filename=temp, mode="wb", compresslevel=9, mtime=0) as dst:
+                    while chunk := src.read(COMPRESS_CHUNK_BYTES):
+                        dst.write(chunk)
+            else:
+                compressor = brotli.Compressor(quality=11)
+                with temp.open("wb") as dst:
+                    while chunk := src.read(COMPRESS_CHUNK_BYTES):
+                        dst.write(compressor.process(chunk))
+                    dst.write(compressor.finish())
+        os.replace(temp, target)
+    finally:
+        try:
+            os.unlink(temp)
+        except FileNotFoundError:
+            pass
+    return target.stat().st_size
+
+
+def _precompress(blob: Path, linked_paths: list[Path]) -> list[str]:
+    original_size = blob.stat().st_size
+    if original_size < COMPRESS_MIN_BYTES:
+        return []
+
+    produced: list[str] = []
+    for encoding in available_encodings():
+        target = variant_path(blob, encoding)
+        if not target.exists():
+            compressed_size = _compress_file(blob, target, encoding)
+            if compressed_size > original_size * COMPRESS_MAX_RATIO:
+                target.unlink()
+                continue
+        produced.append(encoding)
+
+    blob_inode = blob.stat().st_ino
+    for linked in linked_paths:
+        for encoding in produced:
+            try:
+                # 그 사이 다른 내용으로 덮어쓰였으면 옛 압축본을 붙이지 않습니다.
+                if linked.stat().st_ino != blob_inode:
+                    break
+                sibling = sibling_variant_path(linked, encoding)
+                temp_link = sibling.with_name(f"{sibling.name}.{os.urandom(4).hex()}.link")
+                os.link(variant_path(blob, encoding), temp_link)
+                os.replace(temp_link, sibling)
+            except FileNotFoundError:
+                break
+    return produced
+
+
+def remove_sibling_variants(path: Path) -> None:
+    for encoding in ENCODING_SUFFIXES:
+        try:
+            os.unlink(sibling_variant_path(path, encoding))
+        except FileNotFoundError:
+            pass
+
+
+def remove_blob_variants(blob: Path) -> None:
+    for encoding in ENCODING_SUFFIXES:
+        try:
+            os.unlink(variant_path(blob, encoding))
+        except FileNotFoundError:
+            pass
+
+
+def _log_failure(future) -> None:
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logging.error(f"Failed to precompress upload: {exc!r}")
+
+
+def schedule_precompress(blob: Path, linked_paths: list[Path]) -> None:
+    """업로드 응답을 막지 않도록 압축본 생성을 백그라운드 스레드 풀에 넘깁니다."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=COMPRESS_WORKERS, thread_name_prefix="storage-compress"
+        )
+    _executor.submit(_precompress, blob, linked_paths).add_done_callback(_log_failure)
+
+
+def shutdown_compress_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,436 @@
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from typing import IO
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from db.models import StorageBlob, StorageObject, utcnow
+
+from .compress import (
+    is_compressible,
+    remove_blob_variants,
+    remove_sibling_variants,
+    schedule_precompress,
+)
+
+STORAGE_DIR = Path(os.getenv("STORAGE_DIR", "./uploads"))
+BLOB_DIR_NAME = ".blobs"
+BLOB_DIR = STORAGE_DIR / BLOB_DIR_NAME
+
+MAX_UPLOAD_BYTES = int(os.getenv("STORAGE_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("STORAGE_UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+# 참조가 끊긴 blob을 바로 지우지 않고 이 시간만큼 둡니다. 진행 중인 업로드와 경합하지 않게 합니다.
+BLOB_GC_GRACE_SEC = int(os.getenv("STORAGE_BLOB_GC_GRACE_SEC", "3600"))
+
+
+def blob_rel_path(sha256: str) -> str:
+    return f"{BLOB_DIR_NAME}/{sha256[:2]}/{sha256}"
+
+
+def blob_path(sha256: str) -> Path:
+    return STORAGE_DIR / blob_rel_path(sha256)
+
+
+def is_sha256(value: str) -> bool:
+    return len(value) == 64 and all(ch in "0123456789abcdef" for ch in value)
+
+
+def _open_temp_file(directory: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    return tempfile.NamedTemporaryFile(
+        dir=directory, prefix=".upload-", suffix=".part", delete=False
+    )
+
+
+def _write_chunk(fp, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    fp.write(chunk)
+
+
+def _close_temp_file(fp) -> None:
+    fp.flush()
+    os.fsync(fp.fileno())
+    fp.close()
+
+
+def _discard(path: str | Path) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class _BlobMissing(Exception):
+    pass
+
+
+async def _hash_stream(file: UploadFile, max_bytes: int) -> tuple[int, str]:
+    """
+    업로드를 디스크에 쓰지 않고 sha256만 계산합니다. 이미 저장된 내용을 다시 올릴 때 씁니다.
+    max_bytes를 넘으면 413으로 중단합니다.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File is too large (max {max_bytes} bytes)")
+
+    hasher = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=413, detail=f"File is too large (max {max_bytes} bytes)"
+            )
+        await run_in_threadpool(hasher.update, chunk)
+    return size, hasher.hexdigest()
+
+
+async def _stream_to_temp(file: UploadFile, max_bytes: int) -> tuple[str, int, str]:
+    """
+    업로드를 청크 단위로 임시 파일에 쓰면서 sha256을 계산합니다.
+    파일 I/O는 모두 스레드풀에서 실행합니다. max_bytes를 넘으면 413으로 중단합니다.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File is too large (max {max_bytes} bytes)")
+
+    hasher = hashlib.sha256()
+    size = 0
+    # blob 디렉토리와 같은 파일시스템에 둬야 rename/link가 가능합니다.
+    fp = await run_in_threadpool(_open_temp_file, BLOB_DIR)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=413, detail=f"File is too large (max {max_bytes} bytes)"
+                )
+            await run_in_threadpool(_write_chunk, fp, hasher, chunk)
+        await run_in_threadpool(_close_temp_file, fp)
+    except BaseException:
+        await run_in_threadpool(fp.close)
+        await run_in_threadpool(_discard, fp.name)
+        raise
+
+    return fp.name, size, hasher.hexdigest()
+
+
+def _copy_to_temp(fileobj: IO[bytes], max_bytes: int) -> tuple[str, int, str]:
+    hasher = hashlib.sha256()
+    size = 0
+    fp = _open_temp_file(BLOB_DIR)
+    try:
+        while chunk := fileobj.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=413, detail=f"File is too large (max {max_bytes} bytes)"
+                )
+            _write_chunk(fp, hasher, chunk)
+        _close_temp_file(fp)
+    except BaseException:
+        fp.close()
+        _discard(fp.name)
+        raise
+
+    return fp.name, size, hasher.hexdigest()
+
+
+def _commit_blob(temp_path: str, sha256: str) -> bool:
+    """임시 파일을 blob 위치로 옮깁니다. 이미 같은 내용이 있으면 버리고 False를 반환합니다."""
+    target = blob_path(sha256)
+    if target.exists():
+        _discard(temp_path)
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(temp_path, target)
+    return True
+
+
+def _link_into_place(sha256: str, target: Path, overwrite: bool) -> None:
+    """논리 경로를 blob의 하드링크로 만듭니다. /uploads 정적 서빙은 그대로 동작합니다."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp_link = target.parent / f".link-{os.getpid()}-{os.urandom(6).hex()}"
+    os.link(blob_path(sha256), temp_link)
+    try:
+        if overwrite:
+            # 이전 내용의 압축본이 새 내용 대신 나가지 않도록 먼저 지웁니다.
+            remove_sibling_variants(target)
+            os.replace(temp_link, target)
+            return
+        # link는 대상이 이미 있으면 실패하므로 동시에 올라온 같은 경로를 덮어쓰지 않습니다.
+        try:
+            os.link(temp_link, target)
+        except FileExistsError:
+            raise HTTPException(status_code=409, detail="File already exists") from None
+    finally:
+        _discard(temp_link)
+
+
+async def _acquire_blob(db: AsyncSession, sha256: str, size: int) -> None:
+    """
+    blob 참조 수를 먼저 올립니다. 커밋할 때까지 행 잠금이 유지되므로
+    그 사이 GC가 같은 blob의 행과 파일을 지우지 못합니다.
+    """
+    now = utcnow()
+    await db.execute(
+        insert(StorageBlob)
+        .values(sha256=sha256, size=size, ref_count=1, created_at=now, updated_at=now)
+        .on_conflict_do_update(
+            index_elements=[StorageBlob.sha256],
+            set_={"ref_count": StorageBlob.ref_count + 1, "updated_at": now},
+        )
+    )
+
+
+async def _release_blob(db: AsyncSession, sha256: str, count: int = 1) -> None:
+    await db.execute(
+        update(StorageBlob)
+        .where(StorageBlob.sha256 == sha256)
+        .values(
+            ref_count=func.greatest(StorageBlob.ref_count - count, 0), updated_at=utcnow()
+        )
+    )
+
+
+async def _attach_object(
+    db: AsyncSession, bucket: str, path: str, sha256: str, size: int, *, overwrite: bool
+) -> str | None:
+    """
+    논리 경로 -> blob 매핑을 기록하고 이전에 연결돼 있던 sha256을 반환합니다.
+    기존 행은 FOR UPDATE로 잠그므로 같은 경로에 동시에 올린 업로드가 서로의 참조를 잃지 않습니다.
+    """
+    now = utcnow()
+    while True:
+        inserted = await db.scalar(
+            insert(StorageObject)
+            .values(
+                bucket=bucket,
+                path=path,
+                sha256=sha256,
+                size=size,
+                created_at=now,
+                updated_at=now,
+            )
+            .on_conflict_do_nothing(index_elements=[StorageObject.bucket, StorageObject.path])
+            .returning(StorageObject.sha256)
+        )
+        if inserted is not None:
+            return None
+        if not overwrite:
+            raise HTTPException(status_code=409, detail="File already exists")
+
+        previous_sha = await db.scalar(
+            select(StorageObject.sha256)
+            .where(StorageObject.bucket == bucket, StorageObject.path == path)
+            .with_for_update()
+        )
+        if previous_sha is None:
+            # INSERT와 SELECT 사이에 행이 지워졌으면 다시 넣습니다.
+            continue
+        await db.execute(
+            update(StorageObject)
+            .where(StorageObject.bucket == bucket, StorageObject.path == path)
+            .values(sha256=sha256, size=size, updated_at=now)
+        )
+        return previous_sha
+
+
+async def _place_object(
+    db: AsyncSession,
+    bucket: str,
+    path: str,
+    temp_path: str | None,
+    sha256: str,
+    size: int,
+    *,
+    overwrite: bool,
+    content_type: str | None,
+) -> bool:
+    """
+    임시 파일을 blob으로 확정하고 bucket/path에 연결합니다. 중복 저장이면 True를 반환합니다.
+    참조 수 증가 -> blob 파일 확정 -> 객체 행 기록 -> 하드링크 -> 커밋 순서라서
+    GC는 잠긴 blob을 지울 수 없고, 실패하면 이번에 만든 blob 파일도 함께 치웁니다.
+    temp_path가 None이면 이미 있는 blob에 연결만 하고, blob 파일이 없으면 _BlobMissing을 냅니다.
+    """
+    target = STORAGE_DIR / bucket / path
+    created = False
+    try:
+        await _acquire_blob(db, sha256, size)
+        if temp_path is None:
+            if not await run_in_threadpool(blob_path(sha256).exists):
+                raise _BlobMissing()
+        else:
+            created = await run_in_threadpool(_commit_blob, temp_path, sha256)
+        previous_sha = await _attach_object(
+            db, bucket, path, sha256, size, overwrite=overwrite
+        )
+        if previous_sha is not None:
+            # 같은 내용으로 덮어쓴 경우에도 위에서 올린 참조를 되돌려 수가 맞습니다.
+            await _release_blob(db, previous_sha)
+        await run_in_threadpool(_link_into_place, sha256, target, overwrite)
+        await db.commit()
+    except BaseException:
+        # 행 잠금을 쥔 채로 파일을 먼저 치워야 대기 중인 같은 내용의 업로드와 엇갈리지 않습니다.
+        if temp_path is not None:
+            await run_in_threadpool(_discard, temp_path)
+        if created:
+            await run_in_threadpool(_discard, blob_path(sha256))
+        await db.rollback()
+        raise
+
+    if is_compressible(path, content_type):
+        schedule_precompress(blob_path(sha256), [target])
+    return not created
+
+
+async def _blob_exists(db: AsyncSession, sha256: str) -> bool:
+    found = await db.scalar(select(StorageBlob.sha256).where(StorageBlob.sha256 == sha256))
+    if found is None:
+        return False
+    return await run_in_threadpool(blob_path(sha256).exists)
+
+
+async def store_upload(
+    db: AsyncSession,
+    file: UploadFile,
+    bucket: str,
+    path: str,
+    *,
+    overwrite: bool,
+    expected_sha256: str | None = None,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> dict:
+    """
+    업로드를 내용 해시 기준으로 한 번만 저장하고 bucket/path를 그 blob에 연결합니다.
+    expected_sha256의 blob이 이미 있으면 본문을 디스크에 쓰지 않고 해시만 계산해서,
+    해시가 맞을 때만 연결합니다. 클라이언트가 주장한 해시만으로는 연결하지 않습니다.
+    텍스트 계열 파일은 응답 후 gzip/brotli 압축본을 백그라운드에서 만듭니다.
+    """
+    if expected_sha256 and await _blob_exists(db, expected_sha256):
+        size, sha256 = await _hash_stream(file, max_bytes)
+        if sha256 != expected_sha256:
+            raise HTTPException(
+                status_code=400, detail="sha256 does not match the uploaded content"
+            )
+        try:
+            await _place_object(
+                db,
+                bucket,
+                path,
+                None,
+                sha256,
+                size,
+                overwrite=overwrite,
+                content_type=file.content_type,
+            )
+            return {"size": size, "sha256": sha256, "deduplicated": True}
+        except _BlobMissing:
+            # 확인한 뒤 GC가 blob을 지웠으면 본문을 처음부터 다시 읽어 새로 저장합니다.
+            await file.seek(0)
+
+    temp_path, size, sha256 = await _stream_to_temp(file, max_bytes)
+    if expected_sha256 and expected_sha256 != sha256:
+        await run_in_threadpool(_discard, temp_path)
+        raise HTTPException(status_code=400, detail="sha256 does not match the uploaded content")
+
+    deduplicated = await _place_object(
+        db,
+        bucket,
+        path,
+        temp_path,
+        sha256,
+        size,
+        overwrite=overwrite,
+        content_type=file.content_type,
+    )
+    return {"size": size, "sha256": sha256, "deduplicated": deduplicated}
+
+
+async def store_fileobj(
+    db: AsyncSession,
+    fileobj: IO[bytes],
+    bucket: str,
+    path: str,
+    *,
+    overwrite: bool,
+    content_type: str | None = None,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> dict:
+    """동기 파일 객체(ZIP 멤버 등)를 store_upload와 같은 방식으로 저장합니다."""
+    temp_path, size, sha256 = await run_in_threadpool(_copy_to_temp, fileobj, max_bytes)
+    deduplicated = await _place_object(
+        db, bucket, path, temp_path, sha256, size, overwrite=overwrite, content_type=content_type
+    )
+    return {"size": size, "sha256": sha256, "deduplicated": deduplicated}
+
+
+def _remove_object_file(bucket: str, path: str) -> bool:
+    target = STORAGE_DIR / bucket / path
+    existed = target.exists()
+    _discard(target)
+    remove_sibling_variants(target)
+    return existed
+
+
+async def delete_object(db: AsyncSession, bucket: str, path: str) -> bool:
+    sha256 = await db.scalar(
+        delete(StorageObject)
+        .where(StorageObject.bucket == bucket, StorageObject.path == path)
+        .returning(StorageObject.sha256)
+    )
+    if sha256 is not None:
+        await _release_blob(db, sha256)
+    # 객체 행을 지운 채 잠그고 있는 동안 파일을 지워야, 커밋 직후 같은 경로에 올라온 파일을 지우지 않습니다.
+    existed = await run_in_threadpool(_remove_object_file, bucket, path)
+    await db.commit()
+    return sha256 is not None or existed
+
+
+def _remove_blob_file(sha256: str) -> int:
+    target = blob_path(sha256)
+    try:
+        size = target.stat().st_size
+    except FileNotFoundError:
+        return 0
+    _discard(target)
+    remove_blob_variants(target)
+    return size
+
+
+async def collect_garbage(db: AsyncSession, grace_sec: int = BLOB_GC_GRACE_SEC) -> dict:
+    """
+    참조 수가 0이 된 지 grace_sec이 지난 blob을 DB와 디스크에서 지웁니다.
+    참조 수와 별개로 storage_objects가 가리키는 blob은 지우지 않습니다(RESTRICT 외래 키와 같은 조건).
+    """
+    cutoff = utcnow() - timedelta(seconds=grace_sec)
+    rows = await db.execute(
+        delete(StorageBlob)
+        .where(
+            StorageBlob.ref_count == 0,
+            StorageBlob.updated_at < cutoff,
+            ~exists().where(StorageObject.sha256 == StorageBlob.sha256),
+        )
+        .returning(StorageBlob.sha256)
+    )
+    removed = [row.sha256 for row in rows]
+
+    # 삭제한 행의 잠금을 쥔 채로 파일을 지웁니다. 같은 내용을 올리는 업로드는
+    # 커밋 뒤에 새 행을 만들고 파일을 다시 씁니다.
+    freed_bytes = 0
+    for sha256 in removed:
+        freed_bytes += await run_in_threadpool(_remove_blob_file, sha256)
+    await db.commit()
+
+    return {"deleted": len(removed), "freed_bytes": freed_bytes}
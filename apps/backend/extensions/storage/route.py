@@ -1,8 +1,30 @@
-import os
-from pathlib import Path, PurePosixPath
+from pathlib import PurePosixPath
 from urllib.parse import quote
 
-from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.session import get_db
+
+from .compress import shutdown_compress_pool
+from .func import (
+    BLOB_GC_GRACE_SEC,
+    STORAGE_DIR,
+    blob_rel_path,
+    collect_garbage,
+    delete_object,
+    is_sha256,
+    store_upload,
+)
 
 router = APIRouter(
     prefix="/storage",
@@ -10,10 +32,14 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-STORAGE_DIR = Path(os.getenv("STORAGE_DIR", "./uploads"))
 STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 
 
+@router.on_event("shutdown")
+async def shutdown_event():
+    shutdown_compress_pool()
+
+
 def _normalize_relative_path(path: str) -> str:
     cleaned = path.strip().lstrip("/")
     pure = PurePosixPath(cleaned)
@@ -28,6 +54,14 @@ def _normalize_relative_path(path: str) -> str:
     return normalized
 
 
+def _normalize_bucket(bucket: str) -> str:
+    normalized = _normalize_relative_path(bucket)
+    # .blobs 등 점으로 시작하는 최상위 디렉토리는 내부용입니다.
+    if normalized.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid bucket")
+    return normalized
+
+
 def _encode_path_for_url(path: str) -> str:
     return "/".join(quote(part) for part in path.split("/"))
 
@@ -39,20 +73,29 @@ async def upload_file(
     path: str = Form(...),
     bucket: str = Form("default"),
     upsert: bool = Form(False),
+    sha256: str | None = Form(None),
+    db: AsyncSession = Depends(get_db),
 ):
-    safe_bucket = _normalize_relative_path(bucket)
+    safe_bucket = _normalize_bucket(bucket)
     safe_path = _normalize_relative_path(path)
+    expected_sha256 = sha256.strip().lower() if sha256 else None
+    if expected_sha256 is not None and not is_sha256(expected_sha256):
+        raise HTTPException(status_code=400, detail="Invalid sha256")
 
     target_rel = f"{safe_bucket}/{safe_path}"
     target_abs = STORAGE_DIR / target_rel
-    target_abs.parent.mkdir(parents=True, exist_ok=True)
 
     if target_abs.exists() and not upsert:
         raise HTTPException(status_code=409, detail="File already exists")
 
-    content = await file.read()
-    with target_abs.open("wb") as fp:
-        fp.write(content)
+    saved = await store_upload(
+        db,
+        file,
+        safe_bucket,
+        safe_path,
+        overwrite=upsert,
+        expected_sha256=expected_sha256,
+    )
 
     base_url = str(request.base_url).rstrip("/")
     public_url = f"{base_url}/uploads/{_encode_path_for_url(target_rel)}"
@@ -62,5 +105,32 @@ async def upload_file(
         "bucket": safe_bucket,
         "stored_path": target_rel,
         "public_url": public_url,
+        # 내용이 바뀌지 않는 URL이라 브라우저/CDN이 immutable로 캐시합니다.
+        "blob_url": f"{base_url}/uploads/{blob_rel_path(saved['sha256'])}"
+        f"{_encode_path_for_url(PurePosixPath(safe_path).suffix)}",
+        "size": saved["size"],
+        "sha256": saved["sha256"],
+        "deduplicated": saved["deduplicated"],
         "error": None,
     }
+
+
+@router.delete("/object")
+async def remove_file(
+    path: str,
+    bucket: str = "default",
+    db: AsyncSession = Depends(get_db),
+):
+    safe_bucket = _normalize_bucket(bucket)
+    safe_path = _normalize_relative_path(path)
+    if not await delete_object(db, safe_bucket, safe_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return {"deleted": True}
+
+
+@router.post("/gc")
+async def garbage_collect(
+    grace_sec: int = Query(default=BLOB_GC_GRACE_SEC, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    return await collect_garbage(db, grace_sec)
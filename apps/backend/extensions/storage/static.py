@@ -0,0 +1,140 @@
+import mimetypes
+import os
+import re
+import stat
+from pathlib import Path
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from .compress import available_encodings, sibling_variant_path, variant_path
+from .func import BLOB_DIR_NAME, blob_rel_path
+
+# 내용 해시가 들어간 URL은 내용이 절대 바뀌지 않으므로 1년 동안 재검증 없이 캐시합니다.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 일반 경로는 덮어쓰기(upsert)가 가능하므로 매번 ETag로 재검증합니다.
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_BLOB_URL_RE = re.compile(
+    rf"{re.escape(BLOB_DIR_NAME)}/([0-9a-f]{{2}})/([0-9a-f]{{64}})(\.[A-Za-z0-9]{{1,16}})?"
+)
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    /uploads 정적 서빙입니다.
+    - /uploads/.blobs/<aa>/<sha256>[.ext]: sha256을 강한 ETag로, immutable 캐시로 응답합니다.
+      확장자는 Content-Type을 정하는 데만 씁니다.
+    - 그 밖의 경로: ETag + no-cache로 응답해 If-None-Match 304로 재검증하게 합니다.
+    업로드 때 만들어 둔 gzip/brotli 압축본이 있으면 Accept-Encoding에 맞춰 그대로 보냅니다.
+    Range 요청은 FileResponse가 처리합니다. 점으로 시작하는 내부 파일은 노출하지 않습니다.
+    """
+
+    async def get_response(self, path: str, scope) -> Response:
+        url_path = path.replace(os.sep, "/")
+        match = _BLOB_URL_RE.fullmatch(url_path)
+        if match is not None:
+            return await self._blob_response(scope, match)
+
+        if any(part.startswith(".") for part in url_path.split("/")):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        response = _encoded_response(
+            scope,
+            full_path,
+            stat_result,
+            media_type,
+            lambda encoding: sibling_variant_path(Path(full_path), encoding),
+            status_code=status_code,
+        )
+        response.headers["cache-control"] = REVALIDATE_CACHE_CONTROL
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    async def _blob_response(self, scope, match: re.Match) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        prefix, sha256, suffix = match.groups()
+        if sha256[:2] != prefix:
+            raise HTTPException(status_code=404)
+
+        full_path, stat_result = await run_in_threadpool(
+            self.lookup_path, blob_rel_path(sha256)
+        )
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404)
+
+        media_type = None
+        if suffix:
+            media_type = mimetypes.guess_type(f"file{suffix}")[0]
+        response = _encoded_response(
+            scope,
+            full_path,
+            stat_result,
+            media_type or "application/octet-stream",
+            lambda encoding: variant_path(Path(full_path), encoding),
+        )
+        encoding = response.headers.get("content-encoding")
+        response.headers["etag"] = f'"{sha256}-{encoding}"' if encoding else f'"{sha256}"'
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def _accepted_encodings(scope) -> set[str]:
+    accepted: set[str] = set()
+    for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _encoded_response(
+    scope,
+    full_path,
+    stat_result: os.stat_result,
+    media_type: str,
+    variant_for,
+    status_code: int = 200,
+) -> FileResponse:
+    """미리 만든 압축본 중 클라이언트가 받는 것이 있으면 그 파일로 응답합니다."""
+    accepted = _accepted_encodings(scope)
+    for encoding in available_encodings():
+        if encoding not in accepted:
+            continue
+        candidate = variant_for(encoding)
+        try:
+            candidate_stat = os.stat(candidate)
+        except OSError:
+            continue
+        response = FileResponse(
+            candidate,
+            status_code=status_code,
+            stat_result=candidate_stat,
+            media_type=media_type,
+        )
+        response.headers["content-encoding"] = encoding
+        response.headers["vary"] = "Accept-Encoding"
+        return response
+
+    response = FileResponse(
+        full_path,
+        status_code=status_code,
+        stat_result=stat_result,
+        media_type=media_type,
+    )
+    response.headers["vary"] = "Accept-Encoding"
+    return response
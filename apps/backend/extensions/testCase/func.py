@@ -1,102 +1,361 @@
-import random
-from typing import Callable
+import logging
+import os
+import re
+import time
+import zipfile
+from contextlib import aclosing
+from pathlib import PurePosixPath
+from typing import IO, AsyncIterable, Awaitable, Callable, Iterable, Iterator
 
-from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool
 
-from db.models import TestCase
+from db.models import Problem, TestCase, TestCaseJob, utcnow
 from db.session import SessionLocal
 
+from .reference import check_reference_solution, reference_cases
+from .sandbox import GeneratorPool
 
-def load_generate_function(
-    code: str, seed: int = 0
-) -> Callable[[int], tuple[str, str]]:
+# asyncpg는 한 문장에 바인드 파라미터를 32767개까지만 받습니다. (행당 컬럼 9개)
+MAX_INSERT_CHUNK_SIZE = 3000
+INSERT_CHUNK_SIZE = min(
+    int(os.getenv("TESTCASE_INSERT_CHUNK_SIZE", "500")), MAX_INSERT_CHUNK_SIZE
+)
+
+IMPORT_MAX_ARCHIVE_BYTES = int(
+    os.getenv("TESTCASE_IMPORT_MAX_ARCHIVE_BYTES", str(200 * 1024 * 1024))
+)
+IMPORT_MAX_CASE_BYTES = int(os.getenv("TESTCASE_IMPORT_MAX_CASE_BYTES", str(16 * 1024 * 1024)))
+IMPORT_MAX_TOTAL_BYTES = int(
+    os.getenv("TESTCASE_IMPORT_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024))
+)
+IMPORT_MAX_FILES = int(os.getenv("TESTCASE_IMPORT_MAX_FILES", "10000"))
+IMPORT_INPUT_SUFFIXES = (".in",)
+IMPORT_OUTPUT_SUFFIXES = (".out", ".ans")
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+async def insert_test_case_chunk(db: AsyncSession, rows: list[dict]) -> int:
     """
-    문자열 코드에서 generate(seed: int) 함수를 추출하여 리턴합니다.
+    여러 케이스를 multi-row INSERT 한 번으로 넣고 새로 들어간 개수를 반환합니다.
+    (problem_id, content_hash)가 겹치는 케이스는 건너뜁니다.
     """
-    random.seed(seed)
+    if not rows:
+        return 0
 
-    namespace = {"random": random}
-    exec(code, namespace)
+    result = await db.execute(
+        insert(TestCase)
+        .values(rows)
+        .on_conflict_do_nothing(
+            index_elements=[TestCase.problem_id, TestCase.content_hash]
+        )
+        .returning(TestCase.id)
+    )
+    return len(result.all())
 
-    generate_func = namespace.get("generate")
-    if not callable(generate_func):
-        raise ValueError("generate(seed: int) 함수를 정의해야 합니다.")
 
-    return generate_func
+async def _iterate(cases: AsyncIterable | Iterable):
+    if hasattr(cases, "__aiter__"):
+        async for case in cases:
+            yield case
+    else:
+        for case in cases:
+            yield case
 
 
-def validate_generate_function(
-    generate_func: Callable[[int], tuple[str, str]], seed: int
-) -> None:
+async def insert_test_cases_streaming(
+    db: AsyncSession,
+    problem_id: int,
+    cases: AsyncIterable[tuple] | Iterable[tuple],
+    *,
+    subtask_id: int | None = None,
+    limit: int | None = None,
+    chunk_size: int = INSERT_CHUNK_SIZE,
+    on_progress: Callable[[dict], Awaitable[None]] | None = None,
+) -> dict:
+    """
+    (input, output) 스트림을 chunk_size 단위로 나눠 INSERT하고 청크마다 커밋합니다.
+    limit이 있으면 새로 들어간 케이스가 limit개가 되는 순간 멈춥니다.
+    중간에 실패해도 이미 커밋된 청크는 남습니다.
+    on_progress는 청크를 커밋할 때마다 지금까지의 집계로 호출됩니다.
+    """
+    chunk_size = max(1, min(chunk_size, MAX_INSERT_CHUNK_SIZE))
+    inserted = 0
+    received = 0
+    chunks = 0
+    started_at = time.monotonic()
+    chunk: list[dict] = []
+
+    def snapshot() -> dict:
+        elapsed = time.monotonic() - started_at
+        return {
+            "inserted": inserted,
+            "skipped": received - inserted,
+            "chunks": chunks,
+            "elapsed_ms": int(elapsed * 1000),
+            "cases_per_sec": round(inserted / elapsed, 1) if elapsed > 0 else None,
+        }
+
+    async def flush() -> None:
+        nonlocal inserted, chunks
+        inserted += await insert_test_case_chunk(db, chunk)
+        await db.commit()
+        chunks += 1
+        chunk.clear()
+        if on_progress is not None:
+            await on_progress(snapshot())
+
+    async with aclosing(_iterate(cases)) as stream:
+        async for case in stream:
+            received += 1
+            # (input, output, subtask_id)로 케이스마다 서브태스크를 지정할 수도 있습니다.
+            input_text, output_text, *rest = case
+            chunk.append(
+                {
+                    "problem_id": problem_id,
+                    "subtask_id": rest[0] if rest else subtask_id,
+                    "input": input_text,
+                    "output": output_text,
+                }
+            )
+            # limit을 넘겨 넣지 않도록 남은 개수만큼만 모아서 보냅니다.
+            target = chunk_size if limit is None else min(chunk_size, limit - inserted)
+            if len(chunk) >= target:
+                await flush()
+                if limit is not None and inserted >= limit:
+                    break
+
+    if chunk:
+        await flush()
+
+    stats = snapshot()
+    logging.info(f"Inserted test cases for problem {problem_id}: {stats}")
+    return stats
+
+
+def _natural_key(name: str) -> list:
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def _read_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+    # 헤더의 file_size는 믿지 않고 실제로 읽은 양으로 다시 확인합니다.
+    with archive.open(info) as fp:
+        data = fp.read(IMPORT_MAX_CASE_BYTES + 1)
+    if len(data) > IMPORT_MAX_CASE_BYTES:
+        raise ValueError(f"file is larger than {IMPORT_MAX_CASE_BYTES} bytes")
     try:
-        result = generate_func(seed)
-    except Exception as exc:
-        raise RuntimeError(f"generate({seed}) 실행 중 오류 발생: {exc}") from exc
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        raise ValueError("file is not valid UTF-8") from None
 
-    if not isinstance(result, tuple) or len(result) != 2:
-        raise ValueError("generate(seed)는 (input_text, output_text) 튜플을 반환해야 합니다.")
 
-    input_text, output_text = result
-    if not isinstance(input_text, str) or not isinstance(output_text, str):
-        raise ValueError("generate(seed)가 반환하는 input/output은 문자열이어야 합니다.")
+def pair_archive_members(
+    archive: zipfile.ZipFile, errors: list[dict]
+) -> list[tuple[str, zipfile.ZipInfo, zipfile.ZipInfo]]:
+    """
+    중앙 디렉토리만 보고 N.in / N.out(.ans) 쌍을 만듭니다. 본문은 읽지 않습니다.
+    짝이 없거나 제한을 넘는 파일은 errors에 남기고 건너뜁니다.
+    """
+    inputs: dict[str, zipfile.ZipInfo] = {}
+    outputs: dict[str, zipfile.ZipInfo] = {}
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    if len(members) > IMPORT_MAX_FILES:
+        raise ValueError(f"Archive has too many files (max {IMPORT_MAX_FILES}).")
+
+    total_bytes = 0
+    for info in members:
+        path = PurePosixPath(info.filename)
+        if any(part.startswith(".") or part == "__MACOSX" for part in path.parts):
+            continue
+        suffix = path.suffix.lower()
+        key = str(path.with_suffix(""))
+        if suffix in IMPORT_INPUT_SUFFIXES:
+            bucket = inputs
+        elif suffix in IMPORT_OUTPUT_SUFFIXES:
+            bucket = outputs
+        else:
+            errors.append({"file": info.filename, "error": "unsupported file name"})
+            continue
+        if key in bucket:
+            errors.append({"file": info.filename, "error": "duplicate case name"})
+            continue
+        if info.file_size > IMPORT_MAX_CASE_BYTES:
+            errors.append(
+                {"file": info.filename, "error": f"file is larger than {IMPORT_MAX_CASE_BYTES} bytes"}
+            )
+            continue
+        total_bytes += info.file_size
+        bucket[key] = info
+
+    if total_bytes > IMPORT_MAX_TOTAL_BYTES:
+        raise ValueError(f"Archive expands to more than {IMPORT_MAX_TOTAL_BYTES} bytes.")
+
+    for key in sorted(inputs.keys() - outputs.keys()):
+        errors.append({"file": inputs[key].filename, "error": "missing output file"})
+    for key in sorted(outputs.keys() - inputs.keys()):
+        errors.append({"file": outputs[key].filename, "error": "missing input file"})
+
+    return [
+        (key, inputs[key], outputs[key])
+        for key in sorted(inputs.keys() & outputs.keys(), key=_natural_key)
+    ]
+
+
+def iter_archive_cases(fileobj: IO[bytes], errors: list[dict]) -> Iterator[tuple[str, str]]:
+    """ZIP을 풀지 않고 케이스 쌍을 하나씩 읽어 냅니다. 스레드풀에서 돌리는 것을 전제로 합니다."""
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise ValueError("File is not a valid ZIP archive.") from None
+
+    with archive:
+        for _, input_info, output_info in pair_archive_members(archive, errors):
+            texts = []
+            for info in (input_info, output_info):
+                try:
+                    texts.append(_read_member(archive, info))
+                except (ValueError, zipfile.BadZipFile, RuntimeError, NotImplementedError) as exc:
+                    errors.append({"file": info.filename, "error": str(exc)})
+                    break
+            if len(texts) == 2:
+                yield texts[0], texts[1]
+
+
+async def import_archive_cases(
+    db: AsyncSession,
+    problem_id: int,
+    fileobj: IO[bytes],
+    *,
+    subtask_id: int | None = None,
+) -> dict:
+    """ZIP 안의 케이스를 청크 단위 bulk insert로 넣고 파일별 오류와 함께 결과를 반환합니다."""
+    errors: list[dict] = []
+    # 압축 해제와 파일 읽기는 블로킹이라 스레드풀에서 한 케이스씩 꺼내 옵니다.
+    cases = iterate_in_threadpool(iter_archive_cases(fileobj, errors))
+    stats = await insert_test_cases_streaming(db, problem_id, cases, subtask_id=subtask_id)
+    return {**stats, "errors": errors}
 
 
 async def generate_unique_cases(
-    generate_func: Callable[[int], tuple[str, str]],
+    code: str,
     problem_id: int,
     count: int,
     base_seed: int = 0,
-) -> list[dict]:
+    output_source: str = "generator",
+    on_progress: Callable[[dict], Awaitable[None]] | None = None,
+) -> dict:
     """
-    generate(seed) -> (input_text, output_text) 형태의 함수를 반복 호출하여
-    DB에 이미 존재하는 (input, output)을 제외한 고유 테스트 케이스를 count 개수만큼 생성합니다.
+    generate(seed)를 반복 호출하여 DB에 이미 존재하는 (input, output)을 제외한
+    고유 테스트 케이스를 count 개수만큼 생성합니다.
+    generate는 GeneratorPool의 워커 프로세스에서 실행됩니다.
+    output_source가 "generator"면 generate가 (input_text, output_text)를,
+    "reference"면 input_text만 반환하고 출력은 문제의 정답 코드를 실행해 얻습니다.
+    중복 판정은 (problem_id, content_hash) 유니크 인덱스에 맡기므로 기존 케이스를 읽지 않습니다.
     """
-    results: list[dict] = []
+    max_seed = base_seed + count * 100
+    input_only = output_source == "reference"
+
+    async def generated(pool: GeneratorPool):
+        async with aclosing(pool.stream(base_seed, max_seed)) as stream:
+            async for _, case in stream:
+                yield case
+
+    async def progress(stats: dict) -> None:
+        logging.info(
+            f"Generating test cases for problem {problem_id}: "
+            f"{stats['inserted']}/{count} ({stats['cases_per_sec']} cases/s)"
+        )
+        if on_progress is not None:
+            await on_progress(stats)
 
     async with SessionLocal() as db:
-        try:
-            existing_rows = await db.execute(
-                select(TestCase.input, TestCase.output).where(
-                    TestCase.problem_id == problem_id
+        problem = await db.get(Problem, problem_id)
+        if not problem:
+            raise ValueError(f"Problem with ID {problem_id} not found.")
+        if input_only:
+            check_reference_solution(problem)
+
+        async with GeneratorPool(code, base_seed, input_only=input_only) as pool:
+            cases = generated(pool)
+            if input_only:
+                cases = reference_cases(problem, cases)
+            async with aclosing(cases):
+                stats = await insert_test_cases_streaming(
+                    db, problem_id, cases, limit=count, on_progress=progress
                 )
-            )
-        except Exception as exc:
-            raise RuntimeError(f"DB 조회 중 오류 발생: {exc}") from exc
 
-        existing = set(
-            (row.input.strip(), row.output.strip())
-            for row in existing_rows.all()
-            if row.input is not None and row.output is not None
+    if stats["inserted"] < count:
+        raise RuntimeError(
+            "너무 많은 중복이 발생하여 충분한 케이스를 생성하지 못했습니다."
         )
 
-        seed = base_seed
-        while len(results) < count:
-            try:
-                input_text, output_text = generate_func(seed)
-            except Exception as exc:
-                raise RuntimeError(f"generate({seed}) 실행 중 오류 발생: {exc}") from exc
+    return stats
 
-            pair = (input_text.strip(), output_text.strip())
-            if pair not in existing:
-                existing.add(pair)
-                results.append({"input": input_text, "output": output_text})
 
-            seed += 1
+async def _update_job(job_id: int, **values) -> bool:
+    """작업 행을 갱신하고 취소 요청 여부를 반환합니다."""
+    async with SessionLocal() as db:
+        cancel_requested = await db.scalar(
+            update(TestCaseJob)
+            .where(TestCaseJob.id == job_id)
+            .values(**values)
+            .returning(TestCaseJob.cancel_requested)
+        )
+        await db.commit()
+    return bool(cancel_requested)
 
-            if seed - base_seed > count * 100:
-                raise RuntimeError(
-                    "너무 많은 중복이 발생하여 충분한 케이스를 생성하지 못했습니다."
-                )
 
-        for case in results:
-            db.add(
-                TestCase(
-                    problem_id=problem_id,
-                    input=case["input"],
-                    output=case["output"],
-                )
-            )
+async def run_generation_job(
+    job_id: int,
+    code: str,
+    problem_id: int,
+    count: int,
+    base_seed: int = 0,
+    output_source: str = "generator",
+) -> None:
+    """
+    generate_unique_cases를 test_case_jobs 행과 묶어 실행합니다.
+    청크를 커밋할 때마다 진행 상황을 기록하고 취소 요청을 확인합니다.
+    취소되거나 실패해도 이미 커밋된 청크는 남습니다.
+    """
+    if await _update_job(job_id, status="running", started_at=utcnow()):
+        await _update_job(job_id, status="cancelled", finished_at=utcnow())
+        return
 
-        await db.commit()
+    async def progress(stats: dict) -> None:
+        cancel_requested = await _update_job(
+            job_id,
+            inserted_count=stats["inserted"],
+            skipped_count=stats["skipped"],
+            cases_per_sec=stats["cases_per_sec"],
+        )
+        if cancel_requested:
+            raise GenerationCancelled()
 
-    return results
+    try:
+        await generate_unique_cases(
+            code,
+            problem_id,
+            count,
+            base_seed,
+            output_source,
+            on_progress=progress,
+        )
+    except GenerationCancelled:
+        logging.info(f"Test case generation job {job_id} was cancelled")
+        await _update_job(job_id, status="cancelled", finished_at=utcnow())
+    except Exception as exc:
+        logging.error(f"Test case generation job {job_id} failed: {exc}")
+        await _update_job(
+            job_id,
+            status="failed",
+            error_message=str(exc) or type(exc).__name__,
+            finished_at=utcnow(),
+        )
+    else:
+        await _update_job(job_id, status="succeeded", finished_at=utcnow())
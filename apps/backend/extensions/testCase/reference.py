@@ -0,0 +1,128 @@
+import asyncio
+import os
+from collections import deque
+from typing import AsyncIterable, AsyncIterator
+
+import httpx
+
+from db.models import Problem
+from extensions.runner.func import (
+    LANGUAGE_FILENAME_MAP,
+    PistonRequestError,
+    execute_piston,
+    wall_time_limit_ms,
+)
+from extensions.runner.runtimes import ensure_runtimes, resolve_version
+
+REFERENCE_CONCURRENCY = int(os.getenv("TESTCASE_REFERENCE_CONCURRENCY", "4"))
+# 큰 입력을 만드는 경우가 많아 채점 제한보다 넉넉하게 둡니다.
+REFERENCE_TIME_LIMIT_MS = int(os.getenv("TESTCASE_REFERENCE_TIME_LIMIT_MS", "10000"))
+REFERENCE_MEMORY_LIMIT_MB = int(os.getenv("TESTCASE_REFERENCE_MEMORY_LIMIT_MB", "512"))
+
+
+def check_reference_solution(problem: Problem) -> None:
+    if not problem.reference_code or not problem.reference_code.strip():
+        raise ValueError("문제에 정답 코드(reference_code)가 등록되어 있지 않습니다.")
+    if problem.reference_language not in LANGUAGE_FILENAME_MAP:
+        raise ValueError(
+            f"정답 코드의 언어를 지원하지 않습니다: {problem.reference_language}"
+        )
+
+
+async def _run_reference(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    *,
+    code: str,
+    language: str,
+    version: str,
+    stdin: str,
+) -> str:
+    memory_limit_bytes = REFERENCE_MEMORY_LIMIT_MB * 1024 * 1024
+    async with semaphore:
+        try:
+            result = await execute_piston(
+                client,
+                language=language,
+                version=version,
+                code=code,
+                stdin=stdin,
+                cpu_time_limit_ms=REFERENCE_TIME_LIMIT_MS,
+                wall_time_limit_ms=wall_time_limit_ms(REFERENCE_TIME_LIMIT_MS),
+                run_memory_limit_bytes=memory_limit_bytes,
+                compile_memory_limit_bytes=max(memory_limit_bytes, 512 * 1024 * 1024),
+            )
+        except (PistonRequestError, httpx.HTTPError) as exc:
+            raise RuntimeError(f"정답 코드 실행 요청 실패: {exc}") from exc
+
+    compile_result = result.get("compile") or {}
+    if compile_result.get("code") not in (None, 0):
+        raise RuntimeError(
+            "정답 코드 컴파일 실패: "
+            + (compile_result.get("stderr") or compile_result.get("output") or "")
+        )
+
+    run_result = result.get("run") or {}
+    if run_result.get("status") == "TO":
+        raise RuntimeError(
+            f"정답 코드가 시간 제한({REFERENCE_TIME_LIMIT_MS}ms)을 넘었습니다."
+        )
+    if run_result.get("code") != 0:
+        raise RuntimeError(
+            f"정답 코드 실행 실패 (exit {run_result.get('code')}): "
+            + (run_result.get("stderr") or "")
+        )
+    return run_result.get("stdout") or ""
+
+
+async def reference_cases(
+    problem: Problem,
+    inputs: AsyncIterable[str],
+    concurrency: int = REFERENCE_CONCURRENCY,
+) -> AsyncIterator[tuple[str, str]]:
+    """
+    입력 스트림마다 정답 코드를 실행해 (input, output)을 입력 순서대로 냅니다.
+    최대 concurrency개를 동시에 실행하고, 한 케이스라도 실패하면 전체를 중단합니다.
+    """
+    check_reference_solution(problem)
+    language = problem.reference_language
+    version = "*"
+    if await ensure_runtimes():
+        resolved_version = resolve_version(language)
+        if resolved_version is None:
+            raise ValueError(f"Language runtime is not installed: {language}")
+        version = resolved_version
+
+    concurrency = max(1, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    pending: deque[tuple[str, asyncio.Task]] = deque()
+
+    async with httpx.AsyncClient() as client:
+        try:
+            async for input_text in inputs:
+                pending.append(
+                    (
+                        input_text,
+                        asyncio.create_task(
+                            _run_reference(
+                                client,
+                                semaphore,
+                                code=problem.reference_code,
+                                language=language,
+                                version=version,
+                                stdin=input_text,
+                            )
+                        ),
+                    )
+                )
+                # 세마포어 대기열이 무한히 쌓이지 않도록 동시 실행 수의 두 배까지만 앞서 갑니다.
+                if len(pending) >= concurrency * 2:
+                    input_text, task = pending.popleft()
+                    yield input_text, await task
+
+            while pending:
+                input_text, task = pending.popleft()
+                yield input_text, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
@@ -1,11 +1,26 @@
-from fastapi import APIRouter, BackgroundTasks
-from pydantic import BaseModel
+from typing import Literal
 
-from .func import (
-    generate_unique_cases,
-    load_generate_function,
-    validate_generate_function,
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    UploadFile,
 )
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Problem, ProblemSubtask, TestCaseJob
+from db.serializers import serialize_test_case_job
+from db.session import get_db
+
+from .func import IMPORT_MAX_ARCHIVE_BYTES, import_archive_cases, run_generation_job
+from .reference import check_reference_solution
+from .sandbox import GeneratorPool
 
 
 class GenerateRequest(BaseModel):
@@ -13,6 +28,8 @@ class GenerateRequest(BaseModel):
     code: str
     count: int
     base_seed: int = 0
+    # reference: generate(seed)는 입력만 만들고 출력은 문제의 정답 코드로 계산합니다.
+    output_source: Literal["generator", "reference"] = "generator"
 
 
 router = APIRouter(
@@ -24,24 +41,116 @@ router = APIRouter(
 
 @router.post("/generate")
 async def generate_testcases(
-    payload: GenerateRequest, background_tasks: BackgroundTasks
+    payload: GenerateRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
 ):
+    input_only = payload.output_source == "reference"
+    problem = await db.get(Problem, payload.problem_id)
+    if not problem:
+        return {"error": f"Problem with ID {payload.problem_id} not found."}
+
     try:
-        generate_func = load_generate_function(payload.code, payload.base_seed)
-        validate_generate_function(generate_func, payload.base_seed)
+        if input_only:
+            check_reference_solution(problem)
+        # 첫 seed를 격리된 워커에서 실행해 코드와 반환 형식을 먼저 확인합니다.
+        async with GeneratorPool(
+            payload.code, payload.base_seed, workers=1, input_only=input_only
+        ) as pool:
+            await pool.generate(payload.base_seed)
     except ValueError as exc:
         return {"error": str(exc)}
     except Exception as exc:
         return {"error": f"테스트 케이스 생성 중 오류 발생: {exc}"}
 
+    job = TestCaseJob(
+        problem_id=payload.problem_id,
+        output_source=payload.output_source,
+        requested_count=payload.count,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
     background_tasks.add_task(
-        generate_unique_cases,
-        generate_func,
+        run_generation_job,
+        job.id,
+        payload.code,
         int(payload.problem_id),
         int(payload.count),
         int(payload.base_seed),
+        payload.output_source,
     )
 
     return {
-        "message": f"Started generating {payload.count} unique test cases for problem {payload.problem_id} in background."
+        "message": f"Started generating {payload.count} unique test cases for problem {payload.problem_id} in background.",
+        "job": serialize_test_case_job(job),
     }
+
+
+@router.get("/jobs")
+async def list_generation_jobs(
+    problem_id: int,
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    rows = await db.execute(
+        select(TestCaseJob)
+        .where(TestCaseJob.problem_id == problem_id)
+        .order_by(TestCaseJob.created_at.desc())
+        .limit(limit)
+    )
+    return [serialize_test_case_job(job) for job in rows.scalars().all()]
+
+
+@router.get("/jobs/{job_id}")
+async def get_generation_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await db.get(TestCaseJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_test_case_job(job)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_generation_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await db.get(TestCaseJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status not in ("pending", "running"):
+        raise HTTPException(status_code=409, detail="Job already finished")
+
+    # 실제 중단은 생성 루프가 다음 청크를 커밋할 때 이뤄집니다.
+    job.cancel_requested = True
+    await db.commit()
+    await db.refresh(job)
+    return serialize_test_case_job(job)
+
+
+@router.post("/import")
+async def import_testcases(
+    file: UploadFile = File(...),
+    problem_id: int = Form(...),
+    subtask_id: int | None = Form(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """N.in / N.out(.ans) 쌍이 들어 있는 ZIP으로 테스트 케이스를 한 번에 추가합니다."""
+    if file.size is not None and file.size > IMPORT_MAX_ARCHIVE_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Archive is too large (max {IMPORT_MAX_ARCHIVE_BYTES} bytes)",
+        )
+
+    problem = await db.get(Problem, problem_id)
+    if not problem:
+        raise HTTPException(status_code=404, detail="Problem not found")
+
+    if subtask_id is not None:
+        subtask = await db.get(ProblemSubtask, subtask_id)
+        if not subtask or subtask.problem_id != problem_id:
+            raise HTTPException(status_code=404, detail="Subtask not found")
+
+    try:
+        # UploadFile은 큰 파일을 디스크에 spool하므로 ZIP을 메모리에 올리지 않고 읽습니다.
+        return await import_archive_cases(db, problem_id, file.file, subtask_id=subtask_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -0,0 +1,216 @@
+import asyncio
+import multiprocessing
+import os
+import random
+import resource
+import signal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Callable
+
+GENERATOR_WORKERS = int(os.getenv("TESTCASE_GENERATOR_WORKERS", "2"))
+GENERATOR_CPU_TIMEOUT_SEC = float(os.getenv("TESTCASE_GENERATOR_CPU_TIMEOUT_SEC", "5"))
+GENERATOR_WALL_TIMEOUT_SEC = float(os.getenv("TESTCASE_GENERATOR_WALL_TIMEOUT_SEC", "10"))
+GENERATOR_MEMORY_LIMIT_MB = int(os.getenv("TESTCASE_GENERATOR_MEMORY_LIMIT_MB", "512"))
+
+
+def load_generate_function(
+    code: str, seed: int = 0
+) -> Callable[[int], tuple[str, str]]:
+    """
+    문자열 코드에서 generate(seed: int) 함수를 추출하여 리턴합니다.
+    """
+    random.seed(seed)
+
+    namespace = {"random": random}
+    exec(code, namespace)
+
+    generate_func = namespace.get("generate")
+    if not callable(generate_func):
+        raise ValueError("generate(seed: int) 함수를 정의해야 합니다.")
+
+    return generate_func
+
+
+def check_generated_case(result: object, input_only: bool = False) -> None:
+    if input_only:
+        if not isinstance(result, str):
+            raise ValueError("입력 전용 모드에서 generate(seed)는 input_text 문자열을 반환해야 합니다.")
+        return
+
+    if not isinstance(result, tuple) or len(result) != 2:
+        raise ValueError("generate(seed)는 (input_text, output_text) 튜플을 반환해야 합니다.")
+
+    input_text, output_text = result
+    if not isinstance(input_text, str) or not isinstance(output_text, str):
+        raise ValueError("generate(seed)가 반환하는 input/output은 문자열이어야 합니다.")
+
+
+# 워커 프로세스마다 한 번 로드되는 generate 함수입니다.
+_generate_func: Callable | None = None
+_load_error: str | None = None
+
+
+class _CpuTimeExceeded(Exception):
+    pass
+
+
+def _raise_cpu_time_exceeded(signum, frame):
+    raise _CpuTimeExceeded()
+
+
+def _arm_cpu_limit(cpu_timeout_sec: float) -> None:
+    """
+    사용자 코드를 실행하기 직전에 CPU 시간 제한을 겁니다.
+    ITIMER_PROF는 예외로 끊고, 사용자 코드가 그 예외를 삼켜도
+    RLIMIT_CPU(1초 여유)가 SIGXCPU로 워커를 끝냅니다.
+    """
+    used = resource.getrusage(resource.RUSAGE_SELF)
+    used_sec = used.ru_utime + used.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used_sec + cpu_timeout_sec) + 2
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    signal.setitimer(signal.ITIMER_PROF, cpu_timeout_sec)
+
+
+def _disarm_cpu_limit() -> None:
+    signal.setitimer(signal.ITIMER_PROF, 0)
+
+
+def _init_worker(
+    code: str, base_seed: int, memory_limit_bytes: int, cpu_timeout_sec: float
+) -> None:
+    global _generate_func, _load_error
+
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+    signal.signal(signal.SIGPROF, _raise_cpu_time_exceeded)
+    # 모듈 최상위의 사용자 코드도 exec 시점에 실행되므로 로드 전에 제한을 겁니다.
+    _arm_cpu_limit(cpu_timeout_sec)
+    try:
+        _generate_func = load_generate_function(code, base_seed)
+    except _CpuTimeExceeded:
+        _load_error = f"generate 코드 로드가 CPU 시간 제한({cpu_timeout_sec}초)을 넘었습니다."
+    except Exception as exc:
+        # initializer에서 예외가 나면 풀 전체가 깨지므로 첫 호출 때 돌려줍니다.
+        _load_error = str(exc)
+    finally:
+        _disarm_cpu_limit()
+
+
+def _run_generate(seed: int, cpu_timeout_sec: float, input_only: bool):
+    if _load_error is not None or _generate_func is None:
+        raise ValueError(_load_error or "generate(seed: int) 함수를 정의해야 합니다.")
+
+    # 워커 배치와 상관없이 같은 seed는 같은 결과를 내도록 매 호출마다 시드를 맞춥니다.
+    random.seed(seed)
+    _arm_cpu_limit(cpu_timeout_sec)
+    try:
+        result = _generate_func(seed)
+    except _CpuTimeExceeded:
+        raise RuntimeError(
+            f"generate({seed}) 실행이 CPU 시간 제한({cpu_timeout_sec}초)을 넘었습니다."
+        ) from None
+    except MemoryError:
+        raise RuntimeError(f"generate({seed}) 실행이 메모리 제한을 넘었습니다.") from None
+    except Exception as exc:
+        # 사용자 코드의 예외는 피클링이 안 될 수 있어 메시지만 넘깁니다.
+        raise RuntimeError(f"generate({seed}) 실행 중 오류 발생: {exc}") from None
+    finally:
+        _disarm_cpu_limit()
+
+    check_generated_case(result, input_only)
+    return result
+
+
+class GeneratorPool:
+    """
+    사용자 generate(seed) 코드를 API 프로세스와 분리된 프로세스 풀에서 실행합니다.
+    호출마다 CPU/벽시계 시간 제한을, 워커마다 메모리 제한을 둡니다.
+    input_only면 generate(seed)는 입력 문자열만 반환합니다.
+    """
+
+    def __init__(
+        self,
+        code: str,
+        base_seed: int = 0,
+        workers: int = GENERATOR_WORKERS,
+        cpu_timeout_sec: float = GENERATOR_CPU_TIMEOUT_SEC,
+        wall_timeout_sec: float = GENERATOR_WALL_TIMEOUT_SEC,
+        memory_limit_mb: int = GENERATOR_MEMORY_LIMIT_MB,
+        input_only: bool = False,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.cpu_timeout_sec = cpu_timeout_sec
+        self.wall_timeout_sec = wall_timeout_sec
+        self.input_only = input_only
+        # API 프로세스(이벤트 루프, DB 커넥션 풀)를 fork로 복제하지 않도록
+        # 깨끗한 forkserver 프로세스에서 워커를 띄웁니다.
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_worker,
+            initargs=(code, base_seed, memory_limit_mb * 1024 * 1024, cpu_timeout_sec),
+        )
+
+    async def __aenter__(self) -> "GeneratorPool":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.close(kill=exc_type is not None)
+
+    def _submit(self, seed: int) -> asyncio.Future:
+        future = self._executor.submit(
+            _run_generate, seed, self.cpu_timeout_sec, self.input_only
+        )
+        return asyncio.wrap_future(future)
+
+    async def _wait(self, seed: int, future: asyncio.Future):
+        try:
+            return await asyncio.wait_for(future, timeout=self.wall_timeout_sec)
+        except asyncio.TimeoutError:
+            # 멈춘 워커는 재사용할 수 없으므로 풀을 통째로 정리합니다.
+            self.close(kill=True)
+            raise RuntimeError(
+                f"generate({seed}) 실행이 시간 제한({self.wall_timeout_sec}초)을 넘었습니다."
+            ) from None
+        except BrokenProcessPool:
+            # RLIMIT_CPU(SIGXCPU)나 메모리 부족으로 워커가 죽은 경우입니다.
+            self.close(kill=True)
+            raise RuntimeError(
+                f"generate({seed}) 실행 중 워커 프로세스가 비정상 종료되었습니다."
+            ) from None
+
+    async def generate(self, seed: int):
+        return await self._wait(seed, self._submit(seed))
+
+    async def stream(
+        self, start_seed: int, stop_seed: int
+    ) -> AsyncIterator[tuple[int, object]]:
+        """
+        [start_seed, stop_seed) 범위의 seed를 워커들에 나눠 실행하고
+        seed 순서대로 결과를 냅니다.
+        소비 속도에 맞춰 워커 수의 두 배까지만 미리 실행합니다.
+        """
+        pending: deque[tuple[int, asyncio.Future]] = deque()
+        next_seed = start_seed
+        window = self.workers * 2
+        try:
+            while next_seed < stop_seed or pending:
+                while next_seed < stop_seed and len(pending) < window:
+                    pending.append((next_seed, self._submit(next_seed)))
+                    next_seed += 1
+                seed, future = pending.popleft()
+                yield seed, await self._wait(seed, future)
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def close(self, kill: bool = False) -> None:
+        if kill:
+            # ProcessPoolExecutor는 실행 중인 작업을 멈추는 공개 API가 없습니다.
+            for process in list((self._executor._processes or {}).values()):
+                process.terminate()
+        self._executor.shutdown(wait=False, cancel_futures=True)
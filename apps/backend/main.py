@@ -4,7 +4,6 @@ from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
@@ -18,6 +17,7 @@ for candidate in (
     load_dotenv(candidate)
 
 from db.session import engine, init_db
+from extensions.storage.static import CachedStaticFiles
 
 app = FastAPI()
 
@@ -53,7 +53,10 @@ allow_origin_regex = os.getenv(
 )
 
 class NoCacheMiddleware(BaseHTTPMiddleware):
-    """Prevent reverse proxies / CDNs from caching API responses."""
+    """Prevent reverse proxies / CDNs from caching API responses.
+
+    Responses that already carry cache-control (e.g. /uploads) are left alone.
+    """
 
     async def dispatch(self, request: Request, call_next):  # type: ignore[override]
         response: Response = await call_next(request)
@@ -74,7 +77,7 @@ app.add_middleware(
 
 storage_dir = Path(os.getenv("STORAGE_DIR", "./uploads"))
 storage_dir.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(storage_dir)), name="uploads")
+app.mount("/uploads", CachedStaticFiles(directory=str(storage_dir)), name="uploads")
 
 
 for extension in os.listdir("./extensions/"):
@@ -68,17 +68,67 @@ CREATE TABLE IF NOT EXISTS problems (
   grade text,
   available_languages text[] NOT NULL DEFAULT '{}',
   source text,
-  tags text[] NOT NULL DEFAULT '{}'
+  tags text[] NOT NULL DEFAULT '{}',
+  reference_code text,
+  reference_language text
+);
+
+ALTER TABLE problems ADD COLUMN IF NOT EXISTS reference_code text;
+ALTER TABLE problems ADD COLUMN IF NOT EXISTS reference_language text;
+
+CREATE TABLE IF NOT EXISTS problem_subtasks (
+  id bigserial PRIMARY KEY,
+  problem_id bigint NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
+  name text NOT NULL,
+  weight real NOT NULL DEFAULT 0,
+  order_index integer NOT NULL DEFAULT 0,
+  created_at timestamptz NOT NULL DEFAULT NOW()
 );
 
 CREATE TABLE IF NOT EXISTS test_cases (
   id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
   problem_id bigint NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
+  subtask_id bigint REFERENCES problem_subtasks(id) ON DELETE SET NULL,
   input text NOT NULL,
   output text NOT NULL,
+  content_hash text,
+  run_count integer NOT NULL DEFAULT 0,
+  fail_count integer NOT NULL DEFAULT 0,
   created_at timestamptz NOT NULL DEFAULT NOW()
 );
 
+ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS run_count integer NOT NULL DEFAULT 0;
+ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS fail_count integer NOT NULL DEFAULT 0;
+ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS subtask_id bigint REFERENCES problem_subtasks(id) ON DELETE SET NULL;
+ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS content_hash text;
+
+CREATE OR REPLACE FUNCTION test_case_content_hash(input_text text, output_text text)
+RETURNS text LANGUAGE sql IMMUTABLE AS $$
+  SELECT encode(
+    sha256(
+      convert_to(
+        btrim(replace(input_text, E'\r\n', E'\n'), E' \t\r\n')
+        || chr(30)
+        || btrim(replace(output_text, E'\r\n', E'\n'), E' \t\r\n'),
+        'UTF8'
+      )
+    ),
+    'hex'
+  )
+$$;
+
+CREATE OR REPLACE FUNCTION test_cases_set_content_hash()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.content_hash := test_case_content_hash(NEW.input, NEW.output);
+  RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER trg_test_cases_content_hash
+  BEFORE INSERT OR UPDATE OF input, output, content_hash ON test_cases
+  FOR EACH ROW EXECUTE FUNCTION test_cases_set_content_hash();
+
 CREATE TABLE IF NOT EXISTS problem_assets (
   id bigserial PRIMARY KEY,
   problem_id bigint NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
@@ -88,12 +138,31 @@ CREATE TABLE IF NOT EXISTS problem_assets (
   created_at timestamptz NOT NULL DEFAULT NOW()
 );
 
+CREATE TABLE IF NOT EXISTS storage_blobs (
+  sha256 text PRIMARY KEY,
+  size bigint NOT NULL,
+  ref_count integer NOT NULL DEFAULT 0,
+  created_at timestamptz NOT NULL DEFAULT NOW(),
+  updated_at timestamptz NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS storage_objects (
+  bucket text NOT NULL,
+  path text NOT NULL,
+  sha256 text NOT NULL REFERENCES storage_blobs(sha256) ON DELETE RESTRICT,
+  size bigint NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT NOW(),
+  updated_at timestamptz NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (bucket, path)
+);
+
 CREATE TABLE IF NOT EXISTS problem_submissions (
   id bigserial PRIMARY KEY,
   user_id uuid NOT NULL REFERENCES users(id) ON DELETE CASCADE,
   problem_id bigint NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
   code text NOT NULL,
   passed_all boolean NOT NULL DEFAULT false,
+  score real NOT NULL DEFAULT 0,
   stdout_list text[] NOT NULL DEFAULT '{}',
   stderr_list text[] NOT NULL DEFAULT '{}',
   submitted_at timestamptz NOT NULL DEFAULT NOW(),
@@ -103,10 +172,43 @@ CREATE TABLE IF NOT EXISTS problem_submissions (
   status_code smallint NOT NULL DEFAULT 0,
   memory_kb real NOT NULL DEFAULT 0,
   time_ms integer NOT NULL DEFAULT 0,
+  wall_time_ms integer NOT NULL DEFAULT 0,
   visibility text NOT NULL DEFAULT 'public',
   cases_total smallint NOT NULL DEFAULT 0,
   cases_done smallint NOT NULL DEFAULT 0,
-  language text NOT NULL
+  language text NOT NULL,
+  language_version text,
+  timings jsonb
+);
+
+ALTER TABLE problem_submissions ADD COLUMN IF NOT EXISTS language_version text;
+ALTER TABLE problem_submissions ADD COLUMN IF NOT EXISTS wall_time_ms integer NOT NULL DEFAULT 0;
+ALTER TABLE problem_submissions ADD COLUMN IF NOT EXISTS score real NOT NULL DEFAULT 0;
+ALTER TABLE problem_submissions ADD COLUMN IF NOT EXISTS timings jsonb;
+
+CREATE TABLE IF NOT EXISTS test_case_jobs (
+  id bigserial PRIMARY KEY,
+  problem_id bigint NOT NULL REFERENCES problems(id) ON DELETE CASCADE,
+  status text NOT NULL DEFAULT 'pending',
+  output_source text NOT NULL DEFAULT 'generator',
+  requested_count integer NOT NULL,
+  inserted_count integer NOT NULL DEFAULT 0,
+  skipped_count integer NOT NULL DEFAULT 0,
+  cases_per_sec real,
+  error_message text,
+  cancel_requested boolean NOT NULL DEFAULT false,
+  created_at timestamptz NOT NULL DEFAULT NOW(),
+  started_at timestamptz,
+  finished_at timestamptz
+);
+
+CREATE TABLE IF NOT EXISTS submission_idempotency_keys (
+  user_id uuid NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  key text NOT NULL,
+  submission_id bigint NOT NULL REFERENCES problem_submissions(id) ON DELETE CASCADE,
+  created_at timestamptz NOT NULL DEFAULT NOW(),
+  expires_at timestamptz NOT NULL,
+  PRIMARY KEY (user_id, key)
 );
 
 CREATE TABLE IF NOT EXISTS quizzes (
@@ -131,9 +233,15 @@ CREATE TABLE IF NOT EXISTS quiz_problems (
   order_index integer NOT NULL DEFAULT 0
 );
 
-CREATE INDEX IF NOT EXISTS idx_problems_org ON problems(organization_id);
-CREATE INDEX IF NOT EXISTS idx_submissions_problem ON problem_submissions(problem_id);
-CREATE INDEX IF NOT EXISTS idx_submissions_user ON problem_submissions(user_id);
-CREATE INDEX IF NOT EXISTS idx_test_cases_problem ON test_cases(problem_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_test_cases_problem_content_hash ON test_cases(problem_id, content_hash);
+CREATE INDEX IF NOT EXISTS idx_problem_subtasks_problem ON problem_subtasks(problem_id);
+CREATE INDEX IF NOT EXISTS idx_test_case_jobs_problem ON test_case_jobs(problem_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_submission_idempotency_keys_expires_at ON submission_idempotency_keys(expires_at);
 CREATE INDEX IF NOT EXISTS idx_quizzes_org ON quizzes(organization_id);
 CREATE INDEX IF NOT EXISTS idx_problem_assets_problem ON problem_assets(problem_id);
+CREATE INDEX IF NOT EXISTS idx_storage_objects_sha256 ON storage_objects(sha256);
+CREATE INDEX IF NOT EXISTS idx_storage_blobs_unreferenced ON storage_blobs(updated_at) WHERE ref_count = 0;
+CREATE INDEX IF NOT EXISTS idx_test_cases_problem_created ON test_cases(problem_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_submissions_problem_id ON problem_submissions(problem_id, id DESC);
+CREATE INDEX IF NOT EXISTS idx_submissions_user_id ON problem_submissions(user_id, id DESC);
+CREATE INDEX IF NOT EXISTS idx_problems_org_id ON problems(organization_id, id DESC);
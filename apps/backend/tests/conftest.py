@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# apps/backend를 import 경로에 넣어 `db`, `extensions`를 바로 가져옵니다.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
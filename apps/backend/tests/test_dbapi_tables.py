@@ -0,0 +1,16 @@
+import pytest
+from fastapi import HTTPException
+
+from db.serializers import HIDDEN_TABLES
+from extensions.dbapi.route import _get_model
+
+
+@pytest.mark.parametrize("table", sorted(HIDDEN_TABLES) + ["Pending-Signups"])
+def test_auth_staging_tables_are_not_exposed(table):
+    with pytest.raises(HTTPException) as excinfo:
+        _get_model(table)
+    assert excinfo.value.status_code == 400
+
+
+def test_regular_tables_are_exposed():
+    assert _get_model("problems").__tablename__ == "problems"
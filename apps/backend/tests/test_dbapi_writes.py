@@ -0,0 +1,191 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from db.base import Base
+from extensions.dbapi import route
+from extensions.dbapi.route import (
+    DeleteRequest,
+    InsertRequest,
+    QueryFilter,
+    SelectRequest,
+    UpdateRequest,
+    delete_rows,
+    insert_rows,
+    select_rows,
+    update_rows,
+)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# /db 쓰기는 PostgreSQL 문법(RETURNING, insertmanyvalues)에 의존하므로 실제 DB가 있을 때만 돌립니다.
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set"
+)
+
+
+def _run(test) -> None:
+    async def main():
+        engine = create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        tag = uuid.uuid4().hex[:12]
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                try:
+                    await test(db, tag)
+                finally:
+                    await db.rollback()
+                    await delete_rows(
+                        DeleteRequest(
+                            table="users",
+                            filters=[QueryFilter(op="eq", column="nickname", value=tag)],
+                        ),
+                        db,
+                    )
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+
+def _user(tag: str, index: int, **extra) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "email": f"{tag}-{index}@example.com",
+        "nickname": tag,
+        **extra,
+    }
+
+
+async def _emails(db, tag: str) -> set[str]:
+    result = await select_rows(
+        SelectRequest(
+            table="users",
+            columns="email",
+            filters=[QueryFilter(op="eq", column="nickname", value=tag)],
+        ),
+        db,
+    )
+    return {row["email"] for row in result["rows"]}
+
+
+def test_update_returns_exactly_the_matched_rows():
+    async def scenario(db, tag):
+        users = [_user(tag, index) for index in range(6)]
+        await insert_rows(InsertRequest(table="users", values=users), db)
+        targets = [users[1]["email"], users[3]["email"], users[4]["email"]]
+
+        result = await update_rows(
+            UpdateRequest(
+                table="users",
+                values={"name": "updated"},
+                filters=[QueryFilter(op="in", column="email", value=targets)],
+                returning=True,
+            ),
+            db,
+        )
+
+        assert result["count"] == 3
+        assert sorted(row["email"] for row in result["rows"]) == sorted(targets)
+        assert all(row["name"] == "updated" for row in result["rows"])
+        assert all("password_hash" not in row for row in result["rows"])
+
+        result = await update_rows(
+            UpdateRequest(
+                table="users",
+                values={"student_id": "s"},
+                filters=[QueryFilter(op="eq", column="nickname", value=tag)],
+            ),
+            db,
+        )
+        assert result == {"rows": [], "count": 6, "error": None}
+
+    _run(scenario)
+
+
+def test_update_constraint_violation_is_a_conflict():
+    async def scenario(db, tag):
+        users = [_user(tag, index) for index in range(2)]
+        await insert_rows(InsertRequest(table="users", values=users), db)
+
+        with pytest.raises(HTTPException) as excinfo:
+            await update_rows(
+                UpdateRequest(
+                    table="users",
+                    values={"email": users[0]["email"]},
+                    filters=[QueryFilter(op="eq", column="email", value=users[1]["email"])],
+                ),
+                db,
+            )
+        assert excinfo.value.status_code == 409
+        assert await _emails(db, tag) == {user["email"] for user in users}
+
+    _run(scenario)
+
+
+def test_delete_returns_the_deleted_rows():
+    async def scenario(db, tag):
+        users = [_user(tag, index) for index in range(5)]
+        await insert_rows(InsertRequest(table="users", values=users), db)
+        targets = [users[0]["email"], users[2]["email"]]
+
+        result = await delete_rows(
+            DeleteRequest(
+                table="users",
+                filters=[QueryFilter(op="in", column="email", value=targets)],
+                returning=True,
+            ),
+            db,
+        )
+
+        assert result["count"] == 2
+        assert sorted(row["email"] for row in result["rows"]) == sorted(targets)
+        assert await _emails(db, tag) == {user["email"] for user in users} - set(targets)
+
+    _run(scenario)
+
+
+def test_insert_returning_follows_input_order(monkeypatch):
+    # 청크 경계와 키 묶음 경계를 모두 지나도록 청크를 작게 잡고 키 집합을 섞습니다.
+    monkeypatch.setattr(route, "INSERT_CHUNK_ROWS", 4)
+
+    async def scenario(db, tag):
+        users = [
+            _user(tag, index, **({"name": f"n{index}"} if index % 7 < 3 else {}))
+            for index in range(30)
+        ]
+        users.reverse()
+
+        result = await insert_rows(InsertRequest(table="users", values=users, returning=True), db)
+
+        assert result["count"] == len(users)
+        assert [row["email"] for row in result["rows"]] == [user["email"] for user in users]
+        assert [row["id"] for row in result["rows"]] == [user["id"] for user in users]
+        assert [row["name"] for row in result["rows"]] == [user.get("name") for user in users]
+        assert all("password_hash" not in row for row in result["rows"])
+
+    _run(scenario)
+
+
+def test_insert_conflict_rolls_back_the_whole_request():
+    async def scenario(db, tag):
+        existing = _user(tag, 0)
+        await insert_rows(InsertRequest(table="users", values=existing), db)
+
+        with pytest.raises(HTTPException) as excinfo:
+            await insert_rows(
+                InsertRequest(
+                    table="users",
+                    values=[_user(tag, 1), _user(tag, 2, name="x"), _user(tag, 0)],
+                ),
+                db,
+            )
+        assert excinfo.value.status_code == 409
+        assert await _emails(db, tag) == {existing["email"]}
+
+    _run(scenario)
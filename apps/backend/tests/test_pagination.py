@@ -0,0 +1,111 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    Table,
+    create_engine,
+    insert,
+    select,
+)
+
+from db.pagination import (
+    InvalidCursor,
+    apply_keyset,
+    decode_cursor,
+    encode_cursor,
+    keyset_columns,
+    keyset_page,
+)
+
+metadata = MetaData()
+items = Table(
+    "items",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("score", Integer, nullable=True),
+)
+
+# 정렬 값이 겹치는 행과 NULL인 행이 섞여 있어야 페이지 경계에서 빠지거나 겹치는 행이 드러납니다.
+SCORES = [5, None, 3, 5, None, 1, 3, None, 5, 2, None, 4]
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(items),
+            [{"id": index + 1, "score": score} for index, score in enumerate(SCORES)],
+        )
+    yield engine
+    engine.dispose()
+
+
+def _expected_ids(ascending: bool) -> list[int]:
+    rows = [(score, index + 1) for index, score in enumerate(SCORES)]
+    # PostgreSQL 기본값: ASC는 NULLS LAST, DESC는 NULLS FIRST입니다.
+    non_null = sorted((row for row in rows if row[0] is not None), reverse=not ascending)
+    nulls = sorted((row for row in rows if row[0] is None), reverse=not ascending)
+    ordered = non_null + nulls if ascending else nulls + non_null
+    return [row_id for _, row_id in ordered]
+
+
+def _read_all_pages(engine, ascending: bool, limit: int) -> list[int]:
+    columns = keyset_columns(items, items.c.score)
+    cursor = None
+    seen: list[int] = []
+    with engine.connect() as conn:
+        for _ in range(len(SCORES) + 1):
+            query = apply_keyset(select(items), columns, ascending, cursor, limit)
+            rows = conn.execute(query).mappings().all()
+            page, cursor = keyset_page(rows, columns, ascending, limit)
+            seen.extend(row["id"] for row in page)
+            if cursor is None:
+                return seen
+    raise AssertionError("pagination did not terminate")
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, len(SCORES)])
+def test_pages_cover_every_row_once_across_null_sort_values(engine, ascending, limit):
+    assert _read_all_pages(engine, ascending, limit) == _expected_ids(ascending)
+
+
+def test_keyset_columns_append_primary_key():
+    assert [col.name for col in keyset_columns(items, items.c.score)] == ["score", "id"]
+    assert [col.name for col in keyset_columns(items, items.c.id)] == ["id"]
+
+
+def test_cursor_round_trip_keeps_types():
+    created = Table(
+        "created",
+        MetaData(),
+        Column("created_at", DateTime(timezone=True)),
+        Column("token", Integer),
+    )
+    columns = [created.c.created_at, created.c.token]
+    values = [datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc), 2**40]
+    token = encode_cursor(columns, False, values)
+    assert decode_cursor(token, columns, False) == values
+    assert decode_cursor(encode_cursor(columns, True, [None, 7]), columns, True) == [None, 7]
+
+
+def test_cursor_from_another_order_is_rejected():
+    columns = keyset_columns(items, items.c.score)
+    token = encode_cursor(columns, True, [3, 7])
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, columns, False)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, [items.c.id], True)
+
+
+@pytest.mark.parametrize("token", ["", "not-a-cursor", uuid.uuid4().hex])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, keyset_columns(items, items.c.score), True)
@@ -0,0 +1,18 @@
+from extensions.runner.func import WALL_TIME_CAP_MS, wall_time_limit_ms
+
+
+def test_wall_limit_is_generous_for_small_cpu_limits():
+    assert wall_time_limit_ms(1000) == 3000
+    # 아주 짧은 제한에는 배수 대신 고정 여유가 붙습니다.
+    assert wall_time_limit_ms(500) == 2500
+
+
+def test_wall_limit_stays_above_cpu_limit_for_default_time_limit():
+    # 기본 time_limit(20초)에도 CPU 제한보다 큰 wall 상한이 남아야 합니다.
+    assert wall_time_limit_ms(20000) > 20000
+    assert wall_time_limit_ms(20000) <= WALL_TIME_CAP_MS
+
+
+def test_wall_limit_never_below_cpu_limit():
+    cpu_limit = WALL_TIME_CAP_MS + 1000
+    assert wall_time_limit_ms(cpu_limit) == cpu_limit
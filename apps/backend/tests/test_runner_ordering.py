@@ -0,0 +1,32 @@
+import uuid
+from types import SimpleNamespace
+
+from extensions.runner.func import order_test_cases
+
+
+def _case(input_text, output_text, run_count=0, fail_count=0):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        input=input_text,
+        output=output_text,
+        run_count=run_count,
+        fail_count=fail_count,
+    )
+
+
+def test_sample_cases_run_first():
+    problem = SimpleNamespace(sample_inputs=["1 2"], sample_outputs=["3"])
+    hidden = _case("5 5", "10")
+    sample = _case("1 2\r\n", "3\n")
+    assert order_test_cases([hidden, sample], problem, False) == [sample, hidden]
+
+
+def test_fail_fast_orders_by_failure_rate():
+    problem = SimpleNamespace(sample_inputs=[], sample_outputs=[])
+    stable = _case("a", "a", run_count=100, fail_count=1)
+    flaky = _case("b", "b", run_count=100, fail_count=40)
+    # 표본 갱신으로 run_count가 fail_count보다 작아도 실패율이 1을 넘지 않습니다.
+    sampled = _case("c", "c", run_count=0, fail_count=3)
+    ordered = order_test_cases([stable, flaky, sampled], problem, True)
+    assert ordered == [sampled, flaky, stable]
+    assert order_test_cases([stable, flaky], problem, False) == [stable, flaky]
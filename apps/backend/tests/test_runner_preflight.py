@@ -0,0 +1,11 @@
+import sys
+
+from extensions.runner.preflight import _matches_backend_python
+
+
+def test_local_compile_only_for_the_backend_python_version():
+    major, minor = sys.version_info[:2]
+    assert _matches_backend_python(f"{major}.{minor}.4")
+    assert not _matches_backend_python(f"{major}.{minor + 1}.0")
+    assert not _matches_backend_python("*")
+    assert not _matches_backend_python(None)
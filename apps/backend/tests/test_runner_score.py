@@ -0,0 +1,37 @@
+from extensions.runner.func import compute_score
+
+
+def test_without_subtasks_score_follows_passed_all():
+    assert compute_score({}, {None: 3}, {None: 3}, True) == 100.0
+    assert compute_score({}, {None: 3}, {None: 2}, False) == 0.0
+
+
+def test_partial_subtask_score():
+    weights = {1: 30.0, 2: 70.0}
+    counts = {1: 2, 2: 3}
+    assert compute_score(weights, counts, {1: 2, 2: 1}, False) == 30.0
+    assert compute_score(weights, counts, {1: 2, 2: 3}, True) == 100.0
+    assert compute_score(weights, counts, {}, False) == 0.0
+
+
+def test_empty_subtask_earns_nothing():
+    # 케이스가 없는 서브태스크가 0 == 0으로 공짜 점수를 주면 안 됩니다.
+    weights = {1: 50.0, 2: 50.0}
+    assert compute_score(weights, {1: 2}, {}, False) == 0.0
+    assert compute_score(weights, {1: 2}, {1: 2}, True) == 100.0
+
+
+def test_all_subtasks_empty_falls_back_to_passed_all():
+    weights = {1: 50.0, 2: 50.0}
+    assert compute_score(weights, {None: 4}, {None: 1}, False) == 0.0
+    assert compute_score(weights, {None: 4}, {None: 4}, True) == 100.0
+
+
+def test_failing_ungrouped_cases_prevent_full_score():
+    weights = {1: 40.0, 2: 60.0}
+    counts = {1: 2, 2: 2, None: 3}
+    score = compute_score(weights, counts, {1: 2, 2: 2, None: 1}, False)
+    assert score < 100.0
+    # 묶이지 않은 케이스는 평균 가중치(50)의 서브태스크 하나로 계산됩니다.
+    assert score == round(100 / 150 * 100, 2)
+    assert compute_score(weights, counts, {1: 2, 2: 2, None: 3}, True) == 100.0